@@ -0,0 +1,79 @@
+# Benchmark: material file throughput, GridFS vs the local disk backend
+#
+# Saves files of several sizes into each backend and sends them back through the
+# backend's download response. The local backend is measured twice: with the
+# chunked fallback and with a server that offers zero-copy send (emulated here
+# with os.sendfile to /dev/null). Needs a reachable MongoDB for GridFS:
+#
+#   BENCH_MONGO_URI=mongodb://localhost:27017 python benchmarks/blob_storage.py
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("MONGO_URI", os.getenv("BENCH_MONGO_URI", "mongodb://localhost:27017"))
+
+import main  # noqa: E402
+
+FILE_SIZES = [int(n) for n in os.getenv("BENCH_FILE_SIZES", "65536,1048576,5242880").split(",")]
+FILES_PER_SIZE = int(os.getenv("BENCH_FILES_PER_SIZE", "20"))
+
+async def chunks_of(data):
+    for offset in range(0, len(data), main.UPLOAD_CHUNK_SIZE):
+        yield data[offset:offset + main.UPLOAD_CHUNK_SIZE]
+
+async def send_response(response, zero_copy, devnull):
+    """Drive a response like an ASGI server would, returns the bytes sent"""
+    sent = 0
+    async def send(message):
+        nonlocal sent
+        if message["type"] == "http.response.body":
+            sent += len(message.get("body", b""))
+        elif message["type"] == "http.response.zerocopysend":
+            sent += os.sendfile(devnull, message["file"].fileno(), message["offset"], message["count"])
+    extensions = {"http.response.zerocopysend": {}} if zero_copy else {}
+    await response({"type": "http", "extensions": extensions}, None, send)
+    return sent
+
+async def run():
+    db = main.client.studentdashboard_bench
+    root = tempfile.mkdtemp(prefix="blob-bench-")
+    backends = [
+        ("gridfs", main.GridFSBlobStorage(AsyncIOMotorGridFSBucket(db)), False),
+        ("local", main.LocalBlobStorage(root), False),
+        ("local (sendfile)", main.LocalBlobStorage(root), True)
+    ]
+    devnull = os.open(os.devnull, os.O_WRONLY)
+
+    print(f"{'backend':>18} {'file size':>10} {'save (MB/s)':>12} {'download (MB/s)':>16}")
+    try:
+        for size in FILE_SIZES:
+            data = os.urandom(size)
+            megabytes = size * FILES_PER_SIZE / (1024 * 1024)
+            for name, storage, zero_copy in backends:
+                started = time.perf_counter()
+                keys = [await storage.save(chunks_of(data), "bench") for _ in range(FILES_PER_SIZE)]
+                save_seconds = time.perf_counter() - started
+
+                started = time.perf_counter()
+                for key in keys:
+                    blob = await storage.open(key)
+                    response = storage.response(blob, 0, blob.length - 1)
+                    assert await send_response(response, zero_copy, devnull) == size, f"{name} sent a short file"
+                download_seconds = time.perf_counter() - started
+
+                for key in keys:
+                    await storage.delete(key)
+                print(f"{name:>18} {size:>10} {megabytes / save_seconds:>12.1f} {megabytes / download_seconds:>16.1f}")
+    finally:
+        os.close(devnull)
+        shutil.rmtree(root)
+        await main.client.drop_database("studentdashboard_bench")
+
+if __name__ == "__main__":
+    asyncio.run(run())
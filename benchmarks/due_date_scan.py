@@ -0,0 +1,93 @@
+# Benchmark: due date notifier scan time against user count
+#
+# Compares the old per-user loop with scan_due_reminders() on a scratch
+# database. Needs a reachable MongoDB:
+#
+#   BENCH_MONGO_URI=mongodb://localhost:27017 python benchmarks/due_date_scan.py
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("MONGO_URI", os.getenv("BENCH_MONGO_URI", "mongodb://localhost:27017"))
+
+import main  # noqa: E402
+
+USER_COUNTS = [int(n) for n in os.getenv("BENCH_USER_COUNTS", "100,1000,5000,20000").split(",")]
+ASSIGNMENTS_PER_USER = 2
+EVENTS_PER_USER = 1
+
+async def seed(db, user_count):
+    await db.users.delete_many({})
+    await db.assignments.delete_many({})
+    await db.events.delete_many({})
+    await db.notifications.delete_many({})
+    await db.email_outbox.delete_many({})
+
+    now = datetime.now(timezone.utc)
+    users = [
+        {"email": f"user{i}@bench.local", "name": f"User {i}", "timezone": "Europe/Berlin", "is_verified": True}
+        for i in range(user_count)
+    ]
+    result = await db.users.insert_many(users)
+    assignments = []
+    events = []
+    for user_id in result.inserted_ids:
+        for j in range(ASSIGNMENTS_PER_USER):
+            assignments.append({
+                "user_id": user_id, "title": f"Assignment {j}", "status": "pending",
+                "due_date": now + timedelta(hours=2 + j), "notification_sent": False
+            })
+        for j in range(EVENTS_PER_USER):
+            events.append({
+                "user_id": user_id, "title": f"Event {j}",
+                "start_time": now + timedelta(hours=3 + j), "notification_sent": False
+            })
+    await db.assignments.insert_many(assignments)
+    await db.events.insert_many(events)
+
+async def legacy_scan(db):
+    """The per-user loop the notifier used before the aggregation rewrite"""
+    now_utc = datetime.now(timezone.utc)
+    tomorrow_utc = now_utc + timedelta(hours=24)
+    users = await db.users.find({}, {"_id": 1, "email": 1, "name": 1, "timezone": 1}).to_list(1000)
+    for user in users:
+        for collection, date_field, extra in (
+            (db.assignments, "due_date", {"status": {"$ne": "completed"}}),
+            (db.events, "start_time", {})
+        ):
+            items = await collection.find({
+                "user_id": user["_id"],
+                date_field: {"$gt": now_utc, "$lt": tomorrow_utc},
+                "notification_sent": {"$ne": True},
+                **extra
+            }).to_list(100)
+            for item in items:
+                await db.notifications.insert_one({"user_id": user["_id"], "reference_id": str(item["_id"])})
+                await collection.update_one({"_id": item["_id"]}, {"$set": {"notification_sent": True}})
+
+async def run():
+    db = main.client.studentdashboard_bench
+    main.db = db
+    await main.create_indexes()
+
+    print(f"{'users':>8} {'legacy (s)':>12} {'aggregation (s)':>16} {'reminders':>10}")
+    for user_count in USER_COUNTS:
+        await seed(db, user_count)
+        started = time.perf_counter()
+        await legacy_scan(db)
+        legacy_seconds = time.perf_counter() - started
+
+        await seed(db, user_count)
+        started = time.perf_counter()
+        sent = await main.scan_due_reminders()
+        scan_seconds = time.perf_counter() - started
+
+        print(f"{user_count:>8} {legacy_seconds:>12.3f} {scan_seconds:>16.3f} {sum(sent.values()):>10}")
+
+    await main.client.drop_database("studentdashboard_bench")
+
+if __name__ == "__main__":
+    asyncio.run(run())
@@ -0,0 +1,74 @@
+# Benchmark: list endpoint serialization, response_model validation vs list_response()
+#
+# Serializes pages of synthetic documents both ways and checks that they produce
+# the same JSON. Does not need MongoDB:
+#
+#   python benchmarks/list_serialization.py
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+from bson import ObjectId
+from fastapi.responses import ORJSONResponse, Response
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+
+import main  # noqa: E402
+
+PAGE_SIZES = [int(n) for n in os.getenv("BENCH_PAGE_SIZES", "20,100,500").split(",")]
+ROUNDS = int(os.getenv("BENCH_ROUNDS", "200"))
+TIMEZONE = "Europe/Berlin"
+
+def assignment(i, now):
+    return {
+        "_id": ObjectId(), "title": f"Assignment {i}", "description": "Read chapter 4 and answer the questions",
+        "due_date": now + timedelta(hours=i), "subject_id": ObjectId(), "priority": "medium",
+        "status": "pending", "user_id": ObjectId(), "created_at": now, "updated_at": None,
+        "notification_sent": False
+    }
+
+def goal(i, now):
+    return {
+        "_id": ObjectId(), "title": f"Goal {i}", "description": None, "target_date": now + timedelta(days=i),
+        "subject_id": ObjectId(), "milestones": [{"title": "First half", "completed": True}], "progress": 50,
+        "completed": False, "completed_at": None, "user_id": ObjectId(), "created_at": now
+    }
+
+async def current_path(field, documents):
+    """What FastAPI does with a returned list: validate into models, encode, render"""
+    content = await serialize_response(field=field, response_content=documents)
+    return ORJSONResponse(content).body
+
+def fast_path(model, documents):
+    return main.list_response(model, documents, Response()).body
+
+async def run():
+    now = datetime.now(timezone.utc).replace(microsecond=123456)
+    print(f"{'model':>20} {'items':>6} {'response_model (ms)':>20} {'list_response (ms)':>19} {'speedup':>8}")
+    for model, factory in ((main.AssignmentResponse, assignment), (main.GoalResponse, goal)):
+        field = create_response_field(name=f"Response_{model.__name__}", type_=List[model])
+        for size in PAGE_SIZES:
+            documents = main.process_dates_for_output([factory(i, now) for i in range(size)], TIMEZONE)
+            assert main.orjson.loads(await current_path(field, documents)) == main.orjson.loads(fast_path(model, documents)), \
+                f"{model.__name__} output differs"
+
+            started = time.perf_counter()
+            for _ in range(ROUNDS):
+                await current_path(field, documents)
+            current_ms = (time.perf_counter() - started) * 1000 / ROUNDS
+
+            started = time.perf_counter()
+            for _ in range(ROUNDS):
+                fast_path(model, documents)
+            fast_ms = (time.perf_counter() - started) * 1000 / ROUNDS
+
+            print(f"{model.__name__:>20} {size:>6} {current_ms:>20.3f} {fast_ms:>19.3f} {current_ms / fast_ms:>7.1f}x")
+
+if __name__ == "__main__":
+    asyncio.run(run())
@@ -0,0 +1,114 @@
+# Benchmark: output date conversion, per-value pytz vs the batch zoneinfo engine
+#
+# First checks the engine against pytz on random instants in every zone, including
+# local times around DST changes, then times a page conversion both ways. The
+# comparison takes about a minute. Does not need MongoDB:
+#
+#   python benchmarks/timezone_conversion.py
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import pytz
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+
+import main  # noqa: E402
+
+SAMPLES_PER_ZONE = int(os.getenv("BENCH_SAMPLES_PER_ZONE", "200"))
+PAGE_SIZES = [int(n) for n in os.getenv("BENCH_PAGE_SIZES", "20,100,500").split(",")]
+ROUNDS = int(os.getenv("BENCH_ROUNDS", "200"))
+BENCH_TIMEZONE = "America/New_York"
+RANGE_START = datetime(2000, 1, 1)
+RANGE_SECONDS = int((datetime(2036, 1, 1) - RANGE_START).total_seconds())
+
+def random_naive(rng):
+    return RANGE_START + timedelta(seconds=rng.randrange(RANGE_SECONDS))
+
+def legacy_to_user(value, user_timezone):
+    """The per-value conversion process_dates_for_output used before the engine"""
+    return value.replace(tzinfo=timezone.utc).astimezone(pytz.timezone(user_timezone))
+
+def legacy_to_utc(value, user_timezone, is_dst=False):
+    return pytz.timezone(user_timezone).localize(value, is_dst=is_dst).astimezone(timezone.utc)
+
+def check_against_pytz(rng):
+    mismatches = []
+    tzdata_differences = 0
+    for zone in pytz.all_timezones:
+        samples = [random_naive(rng) for _ in range(SAMPLES_PER_ZONE)]
+        # Instants and local wall times right around the zone's offset changes
+        transitions = [
+            transition for transition in getattr(pytz.timezone(zone), "_utc_transition_times", [])
+            if RANGE_START <= transition < RANGE_START + timedelta(seconds=RANGE_SECONDS)
+        ]
+        for transition in rng.sample(transitions, min(len(transitions), 10)):
+            local = legacy_to_user(transition, zone).replace(tzinfo=None)
+            for offset in (-90, -30, 0, 30, 90):
+                samples += [transition + timedelta(minutes=offset), local + timedelta(minutes=offset)]
+
+        documents = [{"at": value} for value in samples]
+        main.convert_documents_to_timezone(documents, zone, ("at",))
+        zone_info = ZoneInfo(zone)
+        for value, document in zip(samples, documents):
+            # pytz ships its own copy of the tz database, only compare where both agree on the rules
+            expected = legacy_to_user(value, zone)
+            if expected.utcoffset() != value.replace(tzinfo=timezone.utc).astimezone(zone_info).utcoffset():
+                tzdata_differences += 1
+            elif document["at"].isoformat() != expected.isoformat():
+                mismatches.append(("to user", zone, value, document["at"], expected))
+
+            try:
+                candidates = {legacy_to_utc(value, zone, is_dst) for is_dst in (False, True)}
+            except (OverflowError, ValueError):
+                continue
+            if candidates != {value.replace(tzinfo=zone_info, fold=fold).astimezone(timezone.utc) for fold in (0, 1)}:
+                tzdata_differences += 1
+            elif main.convert_to_utc(value, zone) != legacy_to_utc(value, zone):
+                mismatches.append(("to utc", zone, value, main.convert_to_utc(value, zone), legacy_to_utc(value, zone)))
+    return mismatches, tzdata_differences
+
+def page(size, rng):
+    now = datetime(2026, 3, 1)
+    return [
+        {
+            "due_date": now + timedelta(hours=rng.randrange(24 * 60)),
+            "created_at": now - timedelta(days=rng.randrange(30)),
+            "updated_at": None if i % 2 == 0 else now,
+            "completed_at": None if i % 3 else now
+        }
+        for i in range(size)
+    ]
+
+def run():
+    rng = random.Random(18)
+    mismatches, tzdata_differences = check_against_pytz(rng)
+    for mismatch in mismatches[:20]:
+        print("mismatch", *mismatch)
+    print(f"pytz comparison: {len(mismatches)} mismatches across {len(pytz.all_timezones)} zones "
+          f"({tzdata_differences} samples skipped where the tz databases differ)\n")
+
+    fields = ("due_date", "created_at", "updated_at", "completed_at")
+    print(f"{'items':>6} {'pytz per value (ms)':>20} {'batch engine (ms)':>18} {'speedup':>8}")
+    for size in PAGE_SIZES:
+        documents = page(size, rng)
+
+        started = time.perf_counter()
+        for _ in range(ROUNDS):
+            for document in documents:
+                {field: legacy_to_user(document[field], BENCH_TIMEZONE) for field in fields if document[field]}
+        legacy_ms = (time.perf_counter() - started) * 1000 / ROUNDS
+
+        started = time.perf_counter()
+        for _ in range(ROUNDS):
+            main.convert_documents_to_timezone([dict(document) for document in documents], BENCH_TIMEZONE, fields)
+        engine_ms = (time.perf_counter() - started) * 1000 / ROUNDS
+
+        print(f"{size:>6} {legacy_ms:>20.3f} {engine_ms:>18.3f} {legacy_ms / engine_ms:>7.1f}x")
+
+if __name__ == "__main__":
+    run()
@@ -292,18 +292,19 @@ async function loadDashboardData() {
             spinner.style.display = 'flex';
         });
         
-        // Fetch statistics
-        const statsResponse = await fetch('https://api.studyboard.stmy.me/statistics', {
+        // Fetch everything the dashboard shows in one request
+        const dashboardResponse = await fetch('https://api.studyboard.stmy.me/dashboard', {
             headers: {
                 'Authorization': `Bearer ${token}`
             }
         });
         
-        if (!statsResponse.ok) {
-            throw new Error('Failed to fetch statistics');
+        if (!dashboardResponse.ok) {
+            throw new Error('Failed to fetch dashboard');
         }
         
-        const statsData = await statsResponse.json();
+        const dashboardData = await dashboardResponse.json();
+        const statsData = dashboardData.statistics;
         
         // Update summary cards
         document.getElementById('pending-assignments-count').textContent = statsData.pending_assignments;
@@ -321,53 +322,14 @@ async function loadDashboardData() {
         // Render study time chart
         renderStudyTimeChart(statsData.daily_study_data);
         
-        // Fetch upcoming assignments
-        const assignmentsResponse = await fetch('https://api.studyboard.stmy.me/assignments?status=pending&limit=5', {
-            headers: {
-                'Authorization': `Bearer ${token}`
-            }
-        });
-        
-        if (!assignmentsResponse.ok) {
-            throw new Error('Failed to fetch assignments');
-        }
-        
-        const assignments = await assignmentsResponse.json();
-        
         // Display upcoming assignments
-        displayUpcomingAssignments(assignments);
-        
-        // Fetch upcoming events
-        const eventsResponse = await fetch('https://api.studyboard.stmy.me/events?limit=5&start_after=' + new Date().toISOString(), {
-            headers: {
-                'Authorization': `Bearer ${token}`
-            }
-        });
-        
-        if (!eventsResponse.ok) {
-            throw new Error('Failed to fetch events');
-        }
-        
-        const events = await eventsResponse.json();
+        displayUpcomingAssignments(dashboardData.upcoming_assignments);
         
         // Display upcoming events
-        displayUpcomingEvents(events);
-        
-        // Fetch recent materials
-        const materialsResponse = await fetch('https://api.studyboard.stmy.me/materials?limit=5', {
-            headers: {
-                'Authorization': `Bearer ${token}`
-            }
-        });
-        
-        if (!materialsResponse.ok) {
-            throw new Error('Failed to fetch materials');
-        }
-        
-        const materials = await materialsResponse.json();
+        displayUpcomingEvents(dashboardData.upcoming_events);
         
         // Display recent materials
-        displayRecentMaterials(materials);
+        displayRecentMaterials(dashboardData.recent_materials);
         
     } catch (error) {
         console.error('Error loading dashboard data:', error);
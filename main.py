@@ -2,16 +2,19 @@
 from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, BackgroundTasks, Request, Form, Query
 from gridfs import GridFS
 from motor.motor_asyncio import AsyncIOMotorGridFSBucket
-from fastapi.responses import StreamingResponse, ORJSONResponse
-import io
+from fastapi.responses import StreamingResponse, ORJSONResponse, FileResponse
+import bisect
+import base64
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from fastapi.responses import JSONResponse, HTMLResponse
-from pydantic import BaseModel, EmailStr, Field, validator
-from typing import List, Optional, Dict, Any, Union
+from fastapi.responses import JSONResponse, HTMLResponse, Response
+from pydantic import BaseModel, EmailStr, Field, validator, create_model
+from pydantic.fields import SHAPE_SINGLETON
+from typing import List, Optional, Dict, Any, Union, Tuple, Type
 from datetime import datetime, timedelta
-from pymongo import MongoClient, ASCENDING
-from pymongo.errors import DuplicateKeyError
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from pymongo import MongoClient, ASCENDING, DESCENDING, UpdateOne, ReturnDocument
+from pymongo.errors import DuplicateKeyError, BulkWriteError
 from bson import ObjectId
 from bson.errors import InvalidId
 import jwt
@@ -24,11 +27,16 @@ from email_validator import validate_email, EmailNotValidError
 import aiohttp
 import asyncio
 import threading
+import socket
 import logging
 import uvicorn
 from dotenv import load_dotenv
 import re
 import mimetypes
+from collections import OrderedDict
+from functools import wraps, partial
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 import math
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from slowapi import Limiter, _rate_limit_exceeded_handler
@@ -36,17 +44,21 @@ from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 from starlette.requests import Request
 import json
+import orjson
+import struct
+import anyio
 import pytz
-from datetime import datetime, timezone
+from datetime import datetime, timezone, MINYEAR, MAXYEAR
 from fastapi_cache import FastAPICache
-from fastapi_cache.backends.inmemory import InMemoryBackend
 from fastapi_cache.decorator import cache
 
 import secrets
+import hashlib
 import string
-import smtplib
+import aiosmtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from email.utils import format_datetime
 
 # Load environment variables
 load_dotenv()
@@ -78,13 +90,44 @@ app = FastAPI(
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
+# Reject oversized uploads while they arrive instead of after they were spooled
+class UploadSizeLimitMiddleware:
+    def __init__(self, app, paths: set):
+        self.app = app
+        self.paths = paths
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.paths:
+            return await self.app(scope, receive, send)
+        
+        max_body_size = MAX_FILE_SIZE + UPLOAD_FORM_OVERHEAD
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length and content_length.isdigit() and int(content_length) > max_body_size:
+            response = JSONResponse({"detail": "File size exceeds the maximum limit of 5MB"}, status_code=413)
+            return await response(scope, receive, send)
+        
+        received = 0
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            received += len(message.get("body", b""))
+            if received > max_body_size:
+                # Raised inside the form parser, surfaces as a 413 response
+                raise HTTPException(status_code=413, detail="File size exceeds the maximum limit of 5MB")
+            return message
+        
+        await self.app(scope, limited_receive, send)
+
 # Add middleware
+app.add_middleware(UploadSizeLimitMiddleware, paths={"/materials"})
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # In production, replace with specific frontend origin
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor"],
 )
 
 app.add_middleware(
@@ -110,12 +153,126 @@ db = client.studentdashboard
 # Initialize GridFS for file storage
 fs = AsyncIOMotorGridFSBucket(db)
 
+# Bounded LRU cache with per-entry TTL and hit/miss/eviction counters
+class TTLCache:
+    def __init__(self, name: str, max_size: int, ttl: float):
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (value, expire_time, tag)
+        self._tags = {}  # tag -> set of keys, used for invalidation by user
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        value, expire_time, tag = entry
+        if expire_time <= time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key, value, tag=None, ttl: Optional[float] = None):
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (value, time.monotonic() + (ttl if ttl is not None else self.ttl), tag)
+        if tag is not None:
+            self._tags.setdefault(tag, set()).add(key)
+        while len(self._entries) > self.max_size:
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self.evictions += 1
+
+    def invalidate(self, key):
+        if key in self._entries:
+            self._remove(key)
+            self.invalidations += 1
+
+    def invalidate_tag(self, tag):
+        """Drop every entry stored under the given tag (e.g. all tokens of one user)"""
+        for key in list(self._tags.get(tag, ())):
+            self._remove(key)
+            self.invalidations += 1
+
+    def sweep(self) -> int:
+        """Remove expired entries, returns the number removed"""
+        now = time.monotonic()
+        expired = [key for key, (_, expire_time, _) in self._entries.items() if expire_time <= now]
+        for key in expired:
+            self._remove(key)
+        self.expirations += len(expired)
+        return len(expired)
+
+    def clear(self):
+        self._entries.clear()
+        self._tags.clear()
+
+    def _remove(self, key):
+        _, _, tag = self._entries.pop(key)
+        if tag is not None:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations
+        }
+
 # Caches for better performance
-USER_CACHE = {}
 USER_CACHE_TTL = 300  # 5 minutes
-JWT_CACHE = {}
+USER_CACHE = TTLCache("user", max_size=int(os.getenv("USER_CACHE_SIZE", "10000")), ttl=USER_CACHE_TTL)
 JWT_CACHE_TTL = 60  # 1 minute
+JWT_CACHE = TTLCache("jwt", max_size=int(os.getenv("JWT_CACHE_SIZE", "20000")), ttl=JWT_CACHE_TTL)
+CACHE_SWEEP_INTERVAL = 30  # seconds
 TIMEZONE_CACHE = {}
+ZONE_OFFSET_TABLES = {}
+DATETIME_FIELDS = {}
+
+# Fields kept in USER_CACHE - never cache the password hash
+USER_CACHE_PROJECTION = {"email": 1, "name": 1, "timezone": 1, "is_verified": 1, "created_at": 1, "reminder_mode": 1}
+
+def invalidate_user_caches(user_id):
+    """Drop cached user documents and cached token lookups for a user"""
+    cache_key = str(user_id)
+    USER_CACHE.invalidate(cache_key)
+    JWT_CACHE.invalidate_tag(cache_key)
+
+async def sweep_caches():
+    while True:
+        await asyncio.sleep(CACHE_SWEEP_INTERVAL)
+        for cache_obj in (USER_CACHE, JWT_CACHE):
+            cache_obj.sweep()
+
+# Monitoring counters, each provider returns a JSON-serializable dict
+METRICS_PROVIDERS = {
+    "user_cache": USER_CACHE.stats,
+    "jwt_cache": JWT_CACHE.stats,
+}
 
 # Create indexes for better performance
 async def create_indexes():
@@ -131,12 +288,21 @@ async def create_indexes():
     
     # Compound indexes for common query patterns
     await db.assignments.create_index([("user_id", ASCENDING), ("status", ASCENDING)])
-    await db.assignments.create_index([("user_id", ASCENDING), ("due_date", ASCENDING)])
-    await db.events.create_index([("user_id", ASCENDING), ("start_time", ASCENDING)])
+    await db.assignments.create_index([("user_id", ASCENDING), ("due_date", ASCENDING), ("_id", ASCENDING)])
+    await db.events.create_index([("user_id", ASCENDING), ("start_time", ASCENDING), ("_id", ASCENDING)])
+    # Window scans of the due date notifier are not scoped to a user
+    await db.assignments.create_index([("due_date", ASCENDING)])
+    await db.events.create_index([("start_time", ASCENDING)])
     await db.study_sessions.create_index([("user_id", ASCENDING), ("completed", ASCENDING)])
-    await db.study_sessions.create_index([("user_id", ASCENDING), ("scheduled_date", ASCENDING)])
+    await db.study_sessions.create_index([("user_id", ASCENDING), ("scheduled_date", ASCENDING), ("_id", ASCENDING)])
     await db.goals.create_index([("user_id", ASCENDING), ("completed", ASCENDING)])
     
+    # Keyset pagination indexes, (user, sort key, _id) for every list endpoint
+    await db.materials.create_index([("user_id", ASCENDING), ("uploaded_at", ASCENDING), ("_id", ASCENDING)])
+    await db.goals.create_index([("user_id", ASCENDING), ("target_date", ASCENDING), ("_id", ASCENDING)])
+    await db.notes.create_index([("user_id", ASCENDING), ("created_at", ASCENDING), ("_id", ASCENDING)])
+    await db.notifications.create_index([("user_id", ASCENDING), ("created_at", ASCENDING), ("_id", ASCENDING)])
+    
     # Email verification and password reset indexes
     await db.email_verification.create_index([("token", ASCENDING)], unique=True)
     await db.email_verification.create_index([("email", ASCENDING)])
@@ -150,11 +316,38 @@ async def create_indexes():
     await db.assignment_shares.create_index([("user_id", ASCENDING)])
     await db.assignment_shares.create_index([("expires_at", ASCENDING)], expireAfterSeconds=0)
     
+    # Reminder queue indexes
+    await db.reminders.create_index([("kind", ASCENDING), ("ref_id", ASCENDING)], unique=True)
+    await db.reminders.create_index([("status", ASCENDING), ("fire_at", ASCENDING)])
+    await db.reminders.create_index([("claim_id", ASCENDING)], sparse=True)
+    
+    # Email outbox indexes
+    await db.email_outbox.create_index([("idempotency_key", ASCENDING)], unique=True)
+    await db.email_outbox.create_index([("status", ASCENDING), ("next_attempt_at", ASCENDING)])
+    await db.email_outbox.create_index([("claim_id", ASCENDING)], sparse=True)
+    await db.email_outbox.create_index([("expire_at", ASCENDING)], expireAfterSeconds=0)
+    
+    # Study rollup indexes
+    await db.study_rollups.create_index(
+        [("user_id", ASCENDING), ("day", ASCENDING), ("subject_id", ASCENDING)],
+        unique=True
+    )
+    
     # Notification indexes
     await db.notifications.create_index([("user_id", ASCENDING)])
     await db.notifications.create_index([("created_at", ASCENDING)])
     await db.notifications.create_index([("read", ASCENDING)])
     
+# Batch endpoint settings
+BATCH_MAX_REQUESTS = 20
+BATCH_METHODS = ["GET", "POST", "PUT", "DELETE"]
+BATCH_RESPONSE_HEADERS = {"content-type", "etag", "x-next-cursor", "retry-after", "cache-control"}
+BATCH_EXCLUDED_PATHS = ("/materials/download/", "/export/")  # file responses are streamed, never buffered into a batch
+BATCH_MAX_BODY_SIZE = 256 * 1024  # per item, larger responses are replaced by a 413
+
+# Monitoring settings
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")  # /metrics is disabled unless set
+
 # JWT Settings
 JWT_SECRET = os.getenv("JWT_SECRET", "your_jwt_secret_key")
 JWT_ALGORITHM = "HS256"
@@ -165,6 +358,11 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 # File upload settings
 MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
+UPLOAD_FORM_OVERHEAD = 64 * 1024  # multipart boundaries and the other form fields
+UPLOAD_CHUNK_SIZE = 255 * 1024  # GridFS default chunk size
+DOWNLOAD_CACHE_CONTROL = "private, max-age=31536000, immutable"  # a material's file never changes
+BLOB_STORAGE = os.getenv("BLOB_STORAGE", "gridfs")  # where new material files go: gridfs or local
+BLOB_STORAGE_PATH = os.getenv("BLOB_STORAGE_PATH", "uploads")  # root directory of the local backend
 ALLOWED_EXTENSIONS = {
     ".pdf", ".jpg", ".jpeg", ".png", ".gif", ".xlsx", ".xls", ".doc", ".docx", ".txt"
 }
@@ -195,157 +393,831 @@ async def start_ping_task():
         await asyncio.sleep(60 * 14)  # Ping every 14 minutes (Render free tier sleeps after 15 min)
 
 # Background task for checking due dates and sending notifications
+REMINDER_WINDOW = timedelta(hours=24)
+REMINDER_BATCH_SIZE = int(os.getenv("REMINDER_BATCH_SIZE", "500"))
+
+# Everything that differs between assignment and event reminders
+REMINDER_KINDS = {
+    "assignment": {
+        "collection": "assignments",
+        "date_field": "due_date",
+        "match": {"status": {"$ne": "completed"}},
+        "active": lambda item: item.get("status") != "completed",
+        "notification_type": "assignment_due",
+        "notification_title": "Assignment Due Soon",
+        "message": "Your assignment '{title}' is due on {when}.",
+        "email_subject": "Assignment Due Soon - Student Dashboard",
+        "email_heading": "Assignment Due Reminder",
+        "email_line": "This is a reminder that your assignment <strong>{title}</strong> is due on {when}."
+    },
+    "event": {
+        "collection": "events",
+        "date_field": "start_time",
+        "match": {},
+        "active": lambda item: True,
+        "notification_type": "event_starting",
+        "notification_title": "Event Starting Soon",
+        "message": "Your event '{title}' is starting on {when}.",
+        "email_subject": "Event Starting Soon - Student Dashboard",
+        "email_heading": "Event Reminder",
+        "email_line": "This is a reminder that your event <strong>{title}</strong> is starting on {when}."
+    }
+}
+
+def due_reminders_pipeline(kind: dict, window_start: datetime, window_end: datetime, ids: Optional[list] = None) -> list:
+    """Items due in the window that were not notified yet, joined to their owner"""
+    date_field = kind["date_field"]
+    match = {
+        date_field: {"$gt": window_start, "$lte": window_end},
+        "notification_sent": {"$ne": True},
+        **kind["match"]
+    }
+    if ids is not None:
+        match["_id"] = {"$in": ids}
+    return [
+        {"$match": match},
+        {"$project": {"title": 1, "user_id": 1, date_field: 1}},
+        {"$lookup": {
+            "from": "users",
+            "let": {"uid": "$user_id"},
+            "pipeline": [
+                {"$match": {"$expr": {"$eq": ["$_id", "$$uid"]}}},
+                {"$project": {"name": 1, "email": 1, "timezone": 1, "reminder_mode": 1}}
+            ],
+            "as": "user"
+        }},
+        {"$unwind": "$user"}
+    ]
+
+def render_reminder_email(kind: dict, user_name: str, title: str, when: str) -> str:
+    return f'''
+    <html>
+        <body>
+            <h2>{kind["email_heading"]}</h2>
+            <p>Hello {user_name},</p>
+            <p>{kind["email_line"].format(title=title, when=when)}</p>
+            <p>Log in to your dashboard to view more details.</p>
+        </body>
+    </html>
+    '''
+
+def render_digest_email(user_name: str, messages: List[str]) -> str:
+    items_html = "".join(f"<li>{message}</li>" for message in messages)
+    return f'''
+    <html>
+        <body>
+            <h2>Your Upcoming Deadlines</h2>
+            <p>Hello {user_name},</p>
+            <p>Here is what is coming up in the next 24 hours:</p>
+            <ul>{items_html}</ul>
+            <p>Log in to your dashboard to view more details.</p>
+        </body>
+    </html>
+    '''
+
+async def flush_due_reminders(kind: dict, batch: list, now_utc: datetime, digests: Optional[dict] = None):
+    """Write notifications for a batch and queue its emails.
+    
+    Items of digest-mode users are collected into `digests` (user_id -> user and messages)
+    instead of being emailed one by one; the caller sends them with flush_reminder_digests.
+    """
+    collection = db[kind["collection"]]
+    
+    # Mark as notified first so an overlapping scan cannot pick the same items up
+    await collection.bulk_write(
+        [UpdateOne({"_id": item["_id"]}, {"$set": {"notification_sent": True}}) for item in batch],
+        ordered=False
+    )
+    
+    notifications = []
+    emails = []
+    for item in batch:
+        user = item["user"]
+        # Convert date to user timezone for the message
+        when_user_tz = convert_to_user_timezone(item[kind["date_field"]], user.get("timezone", DEFAULT_TIMEZONE))
+        when_str = when_user_tz.strftime("%B %d, %Y at %I:%M %p")
+        
+        notifications.append({
+            "user_id": item["user_id"],
+            "type": kind["notification_type"],
+            "title": kind["notification_title"],
+            "message": kind["message"].format(title=item["title"], when=when_str),
+            "reference_id": str(item["_id"]),
+            "read": False,
+            "created_at": now_utc
+        })
+        
+        if digests is not None and user.get("reminder_mode") == "digest":
+            digest = digests.setdefault(item["user_id"], {"user": user, "messages": [], "items": []})
+            digest["messages"].append(notifications[-1]["message"])
+            # With the due time, like the single reminder key, so a rescheduled item gets a new digest
+            digest["items"].append(f"{item['_id']}:{item[kind['date_field']].isoformat()}")
+            continue
+        
+        # Keyed by due time so a rescheduled item gets a new reminder, a re-fired one does not
+        emails.append(outbox_message(
+            user["email"],
+            kind["email_subject"],
+            render_reminder_email(kind, user["name"], item["title"], when_str),
+            idempotency_key=f"reminder:{kind['notification_type']}:{item['_id']}:{item[kind['date_field']].isoformat()}"
+        ))
+    
+    await db.notifications.insert_many(notifications, ordered=False)
+    # notification_sent is part of the list responses, so their ETags must change
+    await bump_change_versions_many({item["user_id"] for item in batch}, kind["collection"], "notifications")
+    await enqueue_emails(emails)
+
+async def flush_reminder_digests(digests: dict):
+    """One email per digest-mode user for all reminders collected in this run"""
+    emails = []
+    for user_id, digest in digests.items():
+        key = hashlib.sha1(",".join(sorted(digest["items"])).encode()).hexdigest()
+        emails.append(outbox_message(
+            digest["user"]["email"],
+            "Your Upcoming Deadlines - Student Dashboard",
+            render_digest_email(digest["user"]["name"], digest["messages"]),
+            idempotency_key=f"digest:{user_id}:{key}"
+        ))
+    await enqueue_emails(emails)
+
+async def scan_due_reminders(now_utc: Optional[datetime] = None) -> Dict[str, int]:
+    """Full sweep of the reminder window, one streaming aggregation per collection.
+    
+    The scheduler below fires reminders from the queue; this is kept for manual catch-up runs.
+    """
+    now_utc = now_utc or datetime.now(timezone.utc)
+    window_end = now_utc + REMINDER_WINDOW
+    sent = {}
+    digests = {}
+    
+    for name, kind in REMINDER_KINDS.items():
+        sent[name] = 0
+        batch = []
+        cursor = db[kind["collection"]].aggregate(
+            due_reminders_pipeline(kind, now_utc, window_end),
+            batchSize=REMINDER_BATCH_SIZE
+        )
+        async for item in cursor:
+            batch.append(item)
+            if len(batch) >= REMINDER_BATCH_SIZE:
+                await flush_due_reminders(kind, batch, now_utc, digests)
+                sent[name] += len(batch)
+                batch = []
+        if batch:
+            await flush_due_reminders(kind, batch, now_utc, digests)
+            sent[name] += len(batch)
+    
+    await flush_reminder_digests(digests)
+    return sent
+
+# Reminder queue: one document per assignment/event, fired at due date minus REMINDER_WINDOW
+REMINDER_SCHEDULER_MAX_SLEEP = 60  # seconds, picks up reminders queued by other workers
+REMINDER_CLAIM_TIMEOUT = timedelta(minutes=5)
+REMINDER_DIGEST_HOUR = int(os.getenv("REMINDER_DIGEST_HOUR", "7"))  # local time of the daily digest
+REMINDER_WAKEUP = asyncio.Event()
+REMINDER_STATE = {"next_wake": None}
+
+def as_utc(value: datetime) -> datetime:
+    # Mongo returns naive datetimes that are already UTC
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+def reminder_fire_at(due: datetime, user: Optional[dict], now_utc: datetime) -> datetime:
+    if user and user.get("reminder_mode") == "digest":
+        # The last local digest time before the item is due
+        user_timezone = user.get("timezone", DEFAULT_TIMEZONE)
+        local_due = convert_to_user_timezone(due, user_timezone).replace(tzinfo=None)
+        digest_time = local_due.replace(hour=REMINDER_DIGEST_HOUR, minute=0, second=0, microsecond=0)
+        if digest_time >= local_due:
+            digest_time -= timedelta(days=1)
+        return max(convert_to_utc(digest_time, user_timezone), now_utc)
+    return max(due - REMINDER_WINDOW, now_utc)
+
+async def realign_user_reminders(user_id):
+    """Recompute fire_at of a user's pending reminders after their reminder settings changed"""
+    user = await get_cached_user(user_id)
+    now_utc = datetime.now(timezone.utc)
+    reminders = await db.reminders.find(
+        {"user_id": ObjectId(user_id), "status": "pending", "due_at": {"$exists": True}},
+        {"due_at": 1}
+    ).to_list(None)
+    if reminders:
+        await db.reminders.bulk_write([
+            UpdateOne({"_id": reminder["_id"]}, {"$set": {"fire_at": reminder_fire_at(as_utc(reminder["due_at"]), user, now_utc)}})
+            for reminder in reminders
+        ], ordered=False)
+        REMINDER_WAKEUP.set()
+
+async def sync_reminder(kind_name: str, item: dict):
+    """Queue, move or drop the reminder for an assignment or event after it was written"""
+    kind = REMINDER_KINDS[kind_name]
+    now_utc = datetime.now(timezone.utc)
+    due = item.get(kind["date_field"])
+    
+    if not due or as_utc(due) <= now_utc or item.get("notification_sent") or not kind["active"](item):
+        await cancel_reminder(kind_name, item["_id"])
+        return
+    
+    user = await get_cached_user(item["user_id"])
+    fire_at = reminder_fire_at(as_utc(due), user, now_utc)
+    await db.reminders.update_one(
+        {"kind": kind_name, "ref_id": item["_id"]},
+        {
+            "$set": {"user_id": item["user_id"], "fire_at": fire_at, "due_at": as_utc(due), "status": "pending"},
+            "$unset": {"claim_id": "", "claimed_at": ""}
+        },
+        upsert=True
+    )
+    
+    # Wake the scheduler if this reminder is due before its next planned check
+    next_wake = REMINDER_STATE["next_wake"]
+    if next_wake is None or fire_at < next_wake:
+        REMINDER_WAKEUP.set()
+
+async def cancel_reminder(kind_name: str, ref_id):
+    await db.reminders.delete_one({"kind": kind_name, "ref_id": ObjectId(ref_id)})
+
+async def backfill_reminders():
+    """Queue reminders for items written before the reminder queue existed"""
+    now_utc = datetime.now(timezone.utc)
+    
+    async def queue(kind_name: str, date_field: str, items: list):
+        # Fire times follow each user's reminder settings, like sync_reminder
+        user_ids = list({item["user_id"] for item in items})
+        users = {
+            user["_id"]: user
+            for user in await db.users.find({"_id": {"$in": user_ids}}, {"timezone": 1, "reminder_mode": 1}).to_list(None)
+        }
+        await db.reminders.bulk_write([
+            UpdateOne(
+                {"kind": kind_name, "ref_id": item["_id"]},
+                {"$setOnInsert": {
+                    "user_id": item["user_id"],
+                    "fire_at": reminder_fire_at(as_utc(item[date_field]), users.get(item["user_id"]), now_utc),
+                    "due_at": as_utc(item[date_field]),
+                    "status": "pending"
+                }},
+                upsert=True
+            )
+            for item in items
+        ], ordered=False)
+    
+    for kind_name, kind in REMINDER_KINDS.items():
+        date_field = kind["date_field"]
+        cursor = db[kind["collection"]].find(
+            {date_field: {"$gt": now_utc}, "notification_sent": {"$ne": True}, **kind["match"]},
+            {"user_id": 1, date_field: 1}
+        ).batch_size(REMINDER_BATCH_SIZE)
+        
+        items = []
+        async for item in cursor:
+            items.append(item)
+            if len(items) >= REMINDER_BATCH_SIZE:
+                await queue(kind_name, date_field, items)
+                items = []
+        if items:
+            await queue(kind_name, date_field, items)
+
+async def fire_due_reminders() -> int:
+    """Claim one batch of due reminders and send them, returns the number claimed"""
+    now_utc = datetime.now(timezone.utc)
+    due = await db.reminders.find(
+        {"status": "pending", "fire_at": {"$lte": now_utc}},
+        {"_id": 1}
+    ).sort("fire_at", ASCENDING).limit(REMINDER_BATCH_SIZE).to_list(REMINDER_BATCH_SIZE)
+    if not due:
+        return 0
+    
+    # Claim atomically so concurrent schedulers never fire the same reminder
+    claim_id = uuid.uuid4().hex
+    await db.reminders.update_many(
+        {"_id": {"$in": [reminder["_id"] for reminder in due]}, "status": "pending"},
+        {"$set": {"status": "claimed", "claim_id": claim_id, "claimed_at": now_utc}}
+    )
+    claimed = await db.reminders.find({"claim_id": claim_id}, {"kind": 1, "ref_id": 1, "due_at": 1}).to_list(None)
+    
+    ref_ids = {}
+    queued_due = {}
+    for reminder in claimed:
+        ref_ids.setdefault(reminder["kind"], []).append(reminder["ref_id"])
+        queued_due[reminder["ref_id"]] = as_utc(reminder["due_at"]) if reminder.get("due_at") else None
+    
+    digests = {}
+    for kind_name, ids in ref_ids.items():
+        kind = REMINDER_KINDS[kind_name]
+        date_field = kind["date_field"]
+        # Re-check the item itself, it may have been completed or already notified. Digest
+        # reminders can fire more than REMINDER_WINDOW ahead (25 hour DST days), so the
+        # window reaches the latest due time the claimed reminders were queued for.
+        window_end = max([now_utc + REMINDER_WINDOW] + [queued_due[ref_id] for ref_id in ids if queued_due[ref_id]])
+        items = await db[kind["collection"]].aggregate(
+            due_reminders_pipeline(kind, now_utc, window_end, ids=ids)
+        ).to_list(None)
+        items = [
+            item for item in items
+            if as_utc(item[date_field]) == queued_due[item["_id"]]
+            or (queued_due[item["_id"]] is None and as_utc(item[date_field]) <= now_utc + REMINDER_WINDOW)
+        ]
+        if items:
+            await flush_due_reminders(kind, items, now_utc, digests)
+    await flush_reminder_digests(digests)
+    
+    await db.reminders.delete_many({"claim_id": claim_id})
+    return len(due)
+
+async def release_stale_reminder_claims():
+    # Claims left behind by a worker that died mid-batch
+    await db.reminders.update_many(
+        {"status": "claimed", "claimed_at": {"$lt": datetime.now(timezone.utc) - REMINDER_CLAIM_TIMEOUT}},
+        {"$set": {"status": "pending"}, "$unset": {"claim_id": "", "claimed_at": ""}}
+    )
+
 async def check_upcoming_due_dates():
+    try:
+        await backfill_reminders()
+    except Exception as e:
+        logger.error(f"Error backfilling reminders: {str(e)}")
+    
     while True:
+        REMINDER_WAKEUP.clear()
+        delay = REMINDER_SCHEDULER_MAX_SLEEP
         try:
-            # Get all users
-            users = await db.users.find({}, {"_id": 1, "email": 1, "name": 1, "timezone": 1}).to_list(1000)
-            
-            for user in users:
-                user_id = user["_id"]
-                user_timezone = user.get("timezone", DEFAULT_TIMEZONE)
-                
-                # Check assignments due in the next 24 hours
-                now_utc = datetime.now(timezone.utc)
-                tomorrow_utc = now_utc + timedelta(hours=24)
-                
-                # Find assignments due soon that haven't been notified yet
-                assignments_due_soon = await db.assignments.find({
-                    "user_id": user_id,
-                    "due_date": {"$gt": now_utc, "$lt": tomorrow_utc},
-                    "status": {"$ne": "completed"},
-                    "notification_sent": {"$ne": True}
-                }).to_list(100)
-                
-                for assignment in assignments_due_soon:
-                    # Convert due date to user timezone for email
-                    due_date_user_tz = convert_to_user_timezone(assignment["due_date"], user_timezone)
-                    due_date_str = due_date_user_tz.strftime("%B %d, %Y at %I:%M %p")
-                    
-                    # Create notification
-                    notification = {
-                        "user_id": user_id,
-                        "type": "assignment_due",
-                        "title": "Assignment Due Soon",
-                        "message": f"Your assignment '{assignment['title']}' is due on {due_date_str}.",
-                        "reference_id": str(assignment["_id"]),
-                        "read": False,
-                        "created_at": now_utc
-                    }
-                    
-                    await db.notifications.insert_one(notification)
-                    
-                    # Send email notification
-                    email_content = f'''
-                    <html>
-                        <body>
-                            <h2>Assignment Due Reminder</h2>
-                            <p>Hello {user['name']},</p>
-                            <p>This is a reminder that your assignment <strong>{assignment['title']}</strong> is due on {due_date_str}.</p>
-                            <p>Log in to your dashboard to view more details.</p>
-                        </body>
-                    </html>
-                    '''
-                    
-                    # Send email in background
-                    asyncio.create_task(send_email(
-                        to_email=user["email"],
-                        subject="Assignment Due Soon - Student Dashboard",
-                        html_content=email_content
-                    ))
-                    
-                    # Mark as notified
-                    await db.assignments.update_one(
-                        {"_id": assignment["_id"]},
-                        {"$set": {"notification_sent": True}}
-                    )
-                
-                # Check events starting in the next 24 hours
-                events_starting_soon = await db.events.find({
-                    "user_id": user_id,
-                    "start_time": {"$gt": now_utc, "$lt": tomorrow_utc},
-                    "notification_sent": {"$ne": True}
-                }).to_list(100)
-                
-                for event in events_starting_soon:
-                    # Convert start time to user timezone for email
-                    start_time_user_tz = convert_to_user_timezone(event["start_time"], user_timezone)
-                    start_time_str = start_time_user_tz.strftime("%B %d, %Y at %I:%M %p")
-                    
-                    # Create notification
-                    notification = {
-                        "user_id": user_id,
-                        "type": "event_starting",
-                        "title": "Event Starting Soon",
-                        "message": f"Your event '{event['title']}' is starting on {start_time_str}.",
-                        "reference_id": str(event["_id"]),
-                        "read": False,
-                        "created_at": now_utc
-                    }
-                    
-                    await db.notifications.insert_one(notification)
-                    
-                    # Send email notification
-                    email_content = f'''
-                    <html>
-                        <body>
-                            <h2>Event Reminder</h2>
-                            <p>Hello {user['name']},</p>
-                            <p>This is a reminder that your event <strong>{event['title']}</strong> is starting on {start_time_str}.</p>
-                            <p>Log in to your dashboard to view more details.</p>
-                        </body>
-                    </html>
-                    '''
-                    
-                    # Send email in background
-                    asyncio.create_task(send_email(
-                        to_email=user["email"],
-                        subject="Event Starting Soon - Student Dashboard",
-                        html_content=email_content
-                    ))
-                    
-                    # Mark as notified
-                    await db.events.update_one(
-                        {"_id": event["_id"]},
-                        {"$set": {"notification_sent": True}}
-                    )
+            await release_stale_reminder_claims()
+            while await fire_due_reminders() >= REMINDER_BATCH_SIZE:
+                pass
             
+            # Sleep until the next reminder is due
+            next_reminder = await db.reminders.find_one(
+                {"status": "pending"},
+                {"fire_at": 1},
+                sort=[("fire_at", ASCENDING)]
+            )
+            if next_reminder:
+                seconds_left = (as_utc(next_reminder["fire_at"]) - datetime.now(timezone.utc)).total_seconds()
+                delay = min(max(seconds_left, 0), REMINDER_SCHEDULER_MAX_SLEEP)
         except Exception as e:
-            logger.error(f"Error checking due dates: {str(e)}")
+            logger.error(f"Error firing reminders: {str(e)}")
         
-        # Run every hour
-        await asyncio.sleep(60 * 60)
-from json import JSONEncoder
-from bson import ObjectId
-from fastapi_cache.coder import JsonCoder
-
-# Updated custom JSON encoder class
-class CustomJsonEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, ObjectId):
-            return str(obj)
-        elif isinstance(obj, datetime):
-            return obj.isoformat()
-        return super().default(obj)
-# Create a custom coder class
-class CustomJsonCoder(JsonCoder):
+        REMINDER_STATE["next_wake"] = datetime.now(timezone.utc) + timedelta(seconds=delay)
+        try:
+            await asyncio.wait_for(REMINDER_WAKEUP.wait(), timeout=delay)
+        except asyncio.TimeoutError:
+            pass
+# Lease-based leader election so singleton background jobs run in exactly one process
+NODE_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+LEADER_LEASE_TTL = int(os.getenv("LEADER_LEASE_TTL", "30"))  # seconds
+
+class LeaderLease:
+    def __init__(self, name: str, ttl: int, jobs: list):
+        self.name = name
+        self.ttl = ttl
+        self.renew_interval = max(1, ttl // 3)
+        self.jobs = jobs
+        self.is_leader = False
+        self.holder = None
+        self.expires_at = None
+        self.acquisitions = 0
+        self.renewals = 0
+        self.losses = 0
+        self._last_renewed = None
+        self._tasks = []
+
+    async def try_acquire(self) -> bool:
+        now_utc = datetime.now(timezone.utc)
+        expires_at = now_utc + timedelta(seconds=self.ttl)
+        try:
+            # Take the lease if it expired, or extend it if we already hold it
+            lease = await db.leases.find_one_and_update(
+                {"_id": self.name, "$or": [{"holder": NODE_ID}, {"expires_at": {"$lt": now_utc}}]},
+                {
+                    "$set": {"holder": NODE_ID, "expires_at": expires_at, "renewed_at": now_utc},
+                    "$setOnInsert": {"acquired_at": now_utc}
+                },
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            # Another node holds a live lease
+            lease = await db.leases.find_one({"_id": self.name})
+        
+        self.holder = lease["holder"] if lease else None
+        self.expires_at = lease["expires_at"] if lease else None
+        return self.holder == NODE_ID
+
+    async def run(self):
+        while True:
+            try:
+                acquired = await self.try_acquire()
+                if acquired:
+                    self._last_renewed = time.monotonic()
+                if acquired and not self.is_leader:
+                    self._start_jobs()
+                elif acquired:
+                    self.renewals += 1
+                elif self.is_leader:
+                    logger.warning(f"Lost leader lease '{self.name}' to {self.holder}")
+                    self._stop_jobs()
+            except Exception as e:
+                logger.error(f"Error renewing leader lease: {str(e)}")
+                # Step down once our lease may have expired, another node can take over
+                if self.is_leader and time.monotonic() - self._last_renewed > self.ttl:
+                    self._stop_jobs()
+            await asyncio.sleep(self.renew_interval)
+
+    def _start_jobs(self):
+        logger.info(f"Acquired leader lease '{self.name}' as {NODE_ID}")
+        self.is_leader = True
+        self.acquisitions += 1
+        self._tasks = [asyncio.create_task(job()) for job in self.jobs]
+
+    def _stop_jobs(self):
+        self.is_leader = False
+        self.losses += 1
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+    async def release(self):
+        if self.is_leader:
+            self._stop_jobs()
+            await db.leases.delete_one({"_id": self.name, "holder": NODE_ID})
+
+    def stats(self) -> dict:
+        return {
+            "node_id": NODE_ID,
+            "is_leader": self.is_leader,
+            "holder": self.holder,
+            "expires_at": self.expires_at.isoformat() if self.expires_at else None,
+            "ttl_seconds": self.ttl,
+            "acquisitions": self.acquisitions,
+            "renewals": self.renewals,
+            "losses": self.losses
+        }
+
+from fastapi_cache.coder import Coder
+from fastapi_cache.backends import Backend
+
+# Cached responses are stored as orjson bytes; datetimes are emitted as ISO strings
+def orjson_default(obj):
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+RAW_RESPONSE_MARKER = b"\x00raw:"  # cached endpoints that render their own JSON response
+
+class ORJSONCoder(Coder):
+    @classmethod
+    def encode(cls, value) -> bytes:
+        if isinstance(value, Response):
+            return RAW_RESPONSE_MARKER + value.body
+        return orjson.dumps(value, default=orjson_default, option=orjson.OPT_NON_STR_KEYS)
+
     @classmethod
-    def encode(cls, value):
-        return json.dumps(value, cls=CustomJsonEncoder)
+    def decode(cls, value):
+        if value.startswith(RAW_RESPONSE_MARKER):
+            return Response(value[len(RAW_RESPONSE_MARKER):], media_type="application/json")
+        return orjson.loads(value)
+
+# Bounded LRU store with a byte budget, shared by the in-process backend and the cache server
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+CACHE_ENTRY_OVERHEAD = 96  # rough per-entry bookkeeping cost in bytes
+CACHE_SERVER_URL = os.getenv("CACHE_SERVER_URL")  # e.g. unix:///run/user/1000/studentdashboard/cache.sock
+CACHE_SERVER_SECRET = os.getenv("CACHE_SERVER_SECRET")  # required by the server and sent by workers when set
+CACHE_POOL_SIZE = int(os.getenv("CACHE_POOL_SIZE", "8"))  # connections per worker to the cache server
+# Inside a directory only this user can enter, so other local users can't reach the socket
+CACHE_SERVER_DEFAULT_URL = "unix://" + os.path.join(
+    os.getenv("XDG_RUNTIME_DIR") or os.path.expanduser("~/.cache"), "studentdashboard", "cache.sock"
+)
+
+def cache_namespace(key: str) -> str:
+    # Keys look like "<prefix>:<namespace>:..."
+    parts = key.split(":", 2)
+    return (parts[1] if len(parts) > 2 else "") or "default"
+
+class BoundedCacheStore:
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.used_bytes = 0
+        self._entries = OrderedDict()  # key -> (value, expire_at or None, size)
+        self._namespaces = {}
+
+    def _namespace_stats(self, key: str) -> dict:
+        namespace = cache_namespace(key)
+        if namespace not in self._namespaces:
+            self._namespaces[namespace] = {"entries": 0, "bytes": 0, "hits": 0, "misses": 0, "evictions": 0}
+        return self._namespaces[namespace]
+
+    def get_with_ttl(self, key: str) -> Tuple[int, Optional[bytes]]:
+        stats = self._namespace_stats(key)
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= time.time():
+            self._remove(key)
+            entry = None
+        if entry is None:
+            stats["misses"] += 1
+            return 0, None
+        self._entries.move_to_end(key)
+        stats["hits"] += 1
+        value, expire_at, _ = entry
+        return (int(expire_at - time.time()) if expire_at is not None else -1), value
+
+    def set(self, key: str, value: bytes, expire: Optional[int] = None):
+        if isinstance(value, str):
+            value = value.encode()
+        size = len(key) + len(value) + CACHE_ENTRY_OVERHEAD
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (value, time.time() + expire if expire else None, size)
+        stats = self._namespace_stats(key)
+        stats["entries"] += 1
+        stats["bytes"] += size
+        self.used_bytes += size
+        # Evict least recently used entries until we are back under budget
+        while self.used_bytes > self.max_bytes:
+            oldest_key = next(iter(self._entries))
+            self._namespace_stats(oldest_key)["evictions"] += 1
+            self._remove(oldest_key)
+
+    def clear(self, namespace: Optional[str] = None, key: Optional[str] = None) -> int:
+        if namespace:
+            keys = [existing for existing in self._entries if existing.startswith(namespace)]
+        elif key:
+            keys = [key] if key in self._entries else []
+        else:
+            keys = list(self._entries)
+        for existing in keys:
+            self._remove(existing)
+        return len(keys)
+
+    def _remove(self, key: str):
+        _, _, size = self._entries.pop(key)
+        stats = self._namespace_stats(key)
+        stats["entries"] -= 1
+        stats["bytes"] -= size
+        self.used_bytes -= size
+
+    def stats(self) -> dict:
+        return {
+            "max_bytes": self.max_bytes,
+            "used_bytes": self.used_bytes,
+            "entries": len(self._entries),
+            "namespaces": {namespace: dict(stats) for namespace, stats in self._namespaces.items()}
+        }
+
+class BoundedMemoryBackend(Backend):
+    def __init__(self, max_bytes: int):
+        self.store = BoundedCacheStore(max_bytes)
+
+    async def get_with_ttl(self, key: str) -> Tuple[int, Optional[bytes]]:
+        return self.store.get_with_ttl(key)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return self.store.get_with_ttl(key)[1]
+
+    async def set(self, key: str, value: bytes, expire: Optional[int] = None) -> None:
+        self.store.set(key, value, expire)
+
+    async def clear(self, namespace: Optional[str] = None, key: Optional[str] = None) -> int:
+        return self.store.clear(namespace, key)
+
+    def stats(self) -> dict:
+        return {"mode": "local", **self.store.stats()}
+
+# Shared mode: workers talk to one cache server per host over a small binary protocol.
+# Request: op (1 byte), expire, key length, value length (3 x uint32), key, value
+# Response: status (1 byte), ttl (int32), value length (uint32), value
+# With a secret configured, a connection must start with an "A" request carrying it as the key.
+CACHE_REQUEST_HEADER = struct.Struct("!cIII")
+CACHE_RESPONSE_HEADER = struct.Struct("!ciI")
+
+async def open_cache_connection(url: str):
+    if url.startswith("unix://"):
+        return await asyncio.open_unix_connection(url[len("unix://"):])
+    host, port = url[len("tcp://"):].rsplit(":", 1)
+    return await asyncio.open_connection(host, int(port))
+
+async def cache_round_trip(connection, op: bytes, key: str, value: bytes, expire: int, timeout: float) -> Tuple[bytes, int, bytes]:
+    reader, writer = connection
+    key_bytes = key.encode()
+    writer.write(CACHE_REQUEST_HEADER.pack(op, expire, len(key_bytes), len(value)) + key_bytes + value)
+    await writer.drain()
+    header = await asyncio.wait_for(reader.readexactly(CACHE_RESPONSE_HEADER.size), timeout)
+    status, ttl, length = CACHE_RESPONSE_HEADER.unpack(header)
+    body = await asyncio.wait_for(reader.readexactly(length), timeout) if length else b""
+    return status, ttl, body
+
+class SharedCacheBackend(Backend):
+    def __init__(self, url: str, timeout: float = 0.5, pool_size: int = CACHE_POOL_SIZE,
+                 secret: Optional[str] = CACHE_SERVER_SECRET):
+        self.url = url
+        self.timeout = timeout
+        self.secret = secret
+        # Requests run concurrently on up to pool_size connections, each one in flight at a time
+        self._idle = []
+        self._slots = asyncio.Semaphore(pool_size)
+        self.errors = 0
+        self._namespaces = {}
+
+    async def _connect(self):
+        connection = await asyncio.wait_for(open_cache_connection(self.url), self.timeout)
+        if self.secret:
+            status, _, _ = await cache_round_trip(connection, b"A", self.secret, b"", 0, self.timeout)
+            if status != b"1":
+                connection[1].close()
+                raise ConnectionError("Cache server rejected the secret")
+        return connection
+
+    async def _request(self, op: bytes, key: str = "", value: bytes = b"", expire: int = 0) -> Tuple[int, bytes]:
+        async with self._slots:
+            connection = None
+            try:
+                connection = self._idle.pop() if self._idle else await self._connect()
+                status, ttl, body = await cache_round_trip(connection, op, key, value, expire, self.timeout)
+            except Exception:
+                # Drop the connection, the decorator treats failures as a cache miss
+                self.errors += 1
+                if connection is not None:
+                    connection[1].close()
+                raise
+            self._idle.append(connection)
+        return ttl, (body if status == b"1" else None)
+
+    def _count(self, key: str, hit: bool):
+        stats = self._namespaces.setdefault(cache_namespace(key), {"hits": 0, "misses": 0})
+        stats["hits" if hit else "misses"] += 1
+
+    async def get_with_ttl(self, key: str) -> Tuple[int, Optional[bytes]]:
+        ttl, value = await self._request(b"G", key)
+        self._count(key, value is not None)
+        return ttl, value
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return (await self.get_with_ttl(key))[1]
+
+    async def set(self, key: str, value: bytes, expire: Optional[int] = None) -> None:
+        if isinstance(value, str):
+            value = value.encode()
+        await self._request(b"S", key, value, expire or 0)
+
+    async def clear(self, namespace: Optional[str] = None, key: Optional[str] = None) -> int:
+        if namespace:
+            count, _ = await self._request(b"N", namespace)
+        else:
+            count, _ = await self._request(b"K", key or "")
+        return count
+
+    def stats(self) -> dict:
+        return {"mode": "shared", "url": self.url, "errors": self.errors, "namespaces": dict(self._namespaces)}
+
+async def serve_shared_cache(url: str, max_bytes: int = CACHE_MAX_BYTES, secret: Optional[str] = CACHE_SERVER_SECRET):
+    """Host-local cache server for SharedCacheBackend, run with `python manage.py cache-server`"""
+    store = BoundedCacheStore(max_bytes)
+
+    async def handle(reader, writer):
+        authenticated = not secret
+        try:
+            while True:
+                header = await reader.readexactly(CACHE_REQUEST_HEADER.size)
+                op, expire, key_length, value_length = CACHE_REQUEST_HEADER.unpack(header)
+                key = (await reader.readexactly(key_length)).decode() if key_length else ""
+                value = await reader.readexactly(value_length) if value_length else b""
+                status, ttl, body = b"1", 0, b""
+                if op == b"A":
+                    authenticated = not secret or secrets.compare_digest(key, secret)
+                    status = b"1" if authenticated else b"0"
+                elif not authenticated:
+                    # Unauthenticated clients get nothing but the rejection
+                    writer.write(CACHE_RESPONSE_HEADER.pack(b"0", 0, 0))
+                    await writer.drain()
+                    break
+                elif op == b"G":
+                    ttl, body = store.get_with_ttl(key)
+                    if body is None:
+                        status, body = b"0", b""
+                elif op == b"S":
+                    store.set(key, value, expire or None)
+                elif op == b"N":
+                    ttl = store.clear(namespace=key)
+                elif op == b"K":
+                    ttl = store.clear(key=key or None)
+                else:
+                    status = b"0"
+                writer.write(CACHE_RESPONSE_HEADER.pack(status, ttl, len(body)) + body)
+                await writer.drain()
+        except asyncio.IncompleteReadError:
+            pass
+        finally:
+            writer.close()
+
+    if url.startswith("unix://"):
+        path = url[len("unix://"):]
+        os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+        if os.path.exists(path):
+            os.remove(path)
+        # Only this user may connect, the socket is created 0600 rather than chmodded afterwards
+        previous_umask = os.umask(0o177)
+        try:
+            server = await asyncio.start_unix_server(handle, path=path)
+        finally:
+            os.umask(previous_umask)
+    else:
+        if not secret:
+            logger.warning("Shared cache on TCP without CACHE_SERVER_SECRET, anyone who can reach the port can read it")
+        host, port = url[len("tcp://"):].rsplit(":", 1)
+        server = await asyncio.start_server(handle, host, int(port))
+    logger.info(f"Shared cache listening on {url} with a {max_bytes} byte budget")
+    async with server:
+        await server.serve_forever()
+
+CACHE_BACKEND = SharedCacheBackend(CACHE_SERVER_URL) if CACHE_SERVER_URL else BoundedMemoryBackend(CACHE_MAX_BYTES)
+METRICS_PROVIDERS["response_cache"] = CACHE_BACKEND.stats
+
+# Collections each cache namespace reads; a write to any of them starts a new generation
+CACHE_DEPENDENCIES = {
+    "subjects": ["subjects"],
+    "statistics": ["subjects", "assignments", "events", "study_sessions", "goals"],
+    "dashboard": ["users", "subjects", "assignments", "events", "study_sessions", "goals", "materials"]
+}
+
+async def user_cache_key_builder(func, namespace: str = "", request=None, response=None, args=None, kwargs=None):
+    """Key cached responses by user, timezone and the change versions of what they read.
+    
+    Stale generations are never looked up again and simply age out of the backend.
+    """
+    kwargs = dict(kwargs or {})
+    current_user = kwargs.pop("current_user", None)
+    prefix = f"{FastAPICache.get_prefix()}:{namespace}:"
+    if current_user is not None:
+        versions = await get_change_versions(current_user["_id"])
+        generation = ".".join(str(versions.get(collection, 0)) for collection in CACHE_DEPENDENCIES.get(namespace, []))
+        prefix += f"{current_user['_id']}:{current_user.get('timezone', DEFAULT_TIMEZONE)}:{generation}:"
+    return prefix + hashlib.md5(f"{func.__module__}:{func.__name__}:{args}:{kwargs}".encode()).hexdigest()
+
+# Single-flight: concurrent identical cache misses in this worker share one computation
+SINGLE_FLIGHT_INFLIGHT = {}
+SINGLE_FLIGHT_STATS = {}
+
+def coalesce(namespace: str, key_builder=user_cache_key_builder):
+    """Place below @cache so only misses are coalesced, keyed like the cache entry they fill"""
+    def decorator(func):
+        stats = SINGLE_FLIGHT_STATS.setdefault(namespace, {"calls": 0, "coalesced": 0})
+
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            key_kwargs = {
+                name: value for name, value in kwargs.items()
+                if not isinstance(value, (Request, Response))
+            }
+            key = await key_builder(func, namespace, args=args, kwargs=key_kwargs)
+            stats["calls"] += 1
+            flight = SINGLE_FLIGHT_INFLIGHT.get(key)
+            if flight is not None:
+                stats["coalesced"] += 1
+            else:
+                flight = asyncio.ensure_future(func(*args, **kwargs))
+                SINGLE_FLIGHT_INFLIGHT[key] = flight
+                flight.add_done_callback(lambda done: finish_flight(key, done))
+            # Shield so a disconnecting caller doesn't cancel the work for everyone else
+            return await asyncio.shield(flight)
+
+        return wrapper
+    return decorator
+
+def finish_flight(key: str, flight: asyncio.Future):
+    SINGLE_FLIGHT_INFLIGHT.pop(key, None)
+    if not flight.cancelled():
+        flight.exception()  # Mark as retrieved even if every waiter went away
+
+METRICS_PROVIDERS["single_flight"] = lambda: {
+    "in_flight": len(SINGLE_FLIGHT_INFLIGHT),
+    "namespaces": {namespace: dict(stats) for namespace, stats in SINGLE_FLIGHT_STATS.items()}
+}
 
 # Update your FastAPI cache initialization in the startup event
 @app.on_event("startup")
 async def startup_event():
     await create_indexes()
-    # Initialize in-memory cache with custom coder
-    FastAPICache.init(InMemoryBackend(), coder=CustomJsonCoder)
-    # Start background tasks
-    asyncio.create_task(start_ping_task())
-    asyncio.create_task(check_upcoming_due_dates())
+    # Initialize the bounded response cache (shared per host when CACHE_SERVER_URL is set)
+    FastAPICache.init(CACHE_BACKEND, coder=ORJSONCoder)
+    # Start background tasks, singleton jobs only run on the lease holder
+    asyncio.create_task(LEADER_LEASE.run())
+    asyncio.create_task(sweep_caches())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await LEADER_LEASE.release()
+    await SMTP_POOL.close()
+    PASSWORD_HASH_POOL.shutdown()
+
 # Timezone conversion utilities with caching
-def get_timezone(timezone_str):
+def get_timezone(timezone_str) -> Optional[ZoneInfo]:
+    """ZoneInfo for a timezone name, None if the name is not a valid timezone"""
     if timezone_str not in TIMEZONE_CACHE:
-        TIMEZONE_CACHE[timezone_str] = pytz.timezone(timezone_str)
+        try:
+            TIMEZONE_CACHE[timezone_str] = ZoneInfo(timezone_str)
+        except (ZoneInfoNotFoundError, ValueError, TypeError):
+            TIMEZONE_CACHE[timezone_str] = None
     return TIMEZONE_CACHE[timezone_str]
 
 def convert_to_user_timezone(utc_datetime, user_timezone):
@@ -357,13 +1229,9 @@ def convert_to_user_timezone(utc_datetime, user_timezone):
     if utc_datetime.tzinfo is None:
         utc_datetime = utc_datetime.replace(tzinfo=timezone.utc)
     
-    # Convert to user timezone
-    try:
-        user_tz = get_timezone(user_timezone)
-        return utc_datetime.astimezone(user_tz)
-    except:
-        # Fallback to UTC if timezone is invalid
-        return utc_datetime
+    # Fallback to UTC if timezone is invalid
+    user_tz = get_timezone(user_timezone)
+    return utc_datetime.astimezone(user_tz) if user_tz else utc_datetime
 
 def convert_to_utc(local_datetime, user_timezone):
     """Convert local datetime to UTC"""
@@ -375,31 +1243,110 @@ def convert_to_utc(local_datetime, user_timezone):
         return local_datetime.astimezone(timezone.utc)
     
     # Otherwise, assume it's in user's timezone and convert to UTC
-    try:
-        user_tz = get_timezone(user_timezone)
-        local_with_tz = user_tz.localize(local_datetime)
-        return local_with_tz.astimezone(timezone.utc)
-    except:
+    user_tz = get_timezone(user_timezone)
+    if user_tz is None:
         # Fallback to assuming it's UTC already if timezone is invalid
         return local_datetime.replace(tzinfo=timezone.utc)
+    earlier = local_datetime.replace(tzinfo=user_tz, fold=0)
+    later = local_datetime.replace(tzinfo=user_tz, fold=1)
+    if earlier.utcoffset() == later.utcoffset():
+        return earlier.astimezone(timezone.utc)
+    # Resolve skipped and repeated local times the way pytz's localize() did:
+    # a skipped time keeps the offset from before the change, a repeated one
+    # prefers standard time and otherwise the later instant
+    if earlier.astimezone(timezone.utc).astimezone(user_tz).replace(tzinfo=None) != local_datetime:
+        return earlier.astimezone(timezone.utc)
+    standard = [candidate for candidate in (earlier, later) if not candidate.dst()]
+    chosen = standard[0] if len(standard) == 1 else later
+    return chosen.astimezone(timezone.utc)
+
+def zone_offset_table(timezone_str: str, year: int):
+    """UTC instants at which the zone's offset changes during a year, with a fixed-offset tzinfo for each span"""
+    table = ZONE_OFFSET_TABLES.get((timezone_str, year))
+    if table is not None:
+        return table
+    
+    zone = get_timezone(timezone_str)
+    
+    def local_offset(instant):
+        local = instant.astimezone(zone)
+        return local.utcoffset(), local.tzname()
+    
+    start = datetime(year, 1, 1, tzinfo=timezone.utc)
+    end = datetime(year + 1, 1, 1, tzinfo=timezone.utc)
+    instants, offsets = [start], [local_offset(start)]
+    step = timedelta(hours=6)
+    instant = start
+    while instant < end:
+        next_instant = min(instant + step, end)
+        if local_offset(next_instant) != offsets[-1]:
+            # Narrow the change down to the second it happens
+            low, high = instant, next_instant
+            while high - low > timedelta(seconds=1):
+                middle = low + timedelta(seconds=(high - low).total_seconds() // 2)
+                if local_offset(middle) == offsets[-1]:
+                    low = middle
+                else:
+                    high = middle
+            instants.append(high)
+            offsets.append(local_offset(high))
+        instant = next_instant
+    
+    table = (instants, [timezone(offset, name) for offset, name in offsets])
+    ZONE_OFFSET_TABLES[(timezone_str, year)] = table
+    return table
+
+def datetime_fields(model: Type[BaseModel]) -> tuple:
+    """Names of the datetime fields of a response model, as stored in Mongo"""
+    fields = DATETIME_FIELDS.get(model)
+    if fields is None:
+        fields = DATETIME_FIELDS[model] = tuple(
+            field.alias for field in model.__fields__.values() if field.type_ is datetime
+        )
+    return fields
+
+def convert_documents_to_timezone(documents: list, user_timezone: str, fields) -> list:
+    """Convert the given datetime fields of a page of documents in one pass.
+    
+    Each value is looked up in the zone's per-year offset table and converted to a
+    fixed-offset tzinfo, which is much cheaper than a full zone lookup per value.
+    """
+    if get_timezone(user_timezone) is None:
+        user_timezone = "UTC"
+    tables = {}
+    for document in documents:
+        for field in fields:
+            value = document.get(field)
+            if not isinstance(value, datetime):
+                continue
+            if value.tzinfo is None:
+                value = value.replace(tzinfo=timezone.utc)
+            elif value.tzinfo is not timezone.utc:
+                value = value.astimezone(timezone.utc)
+            if value.year in (MINYEAR, MAXYEAR):
+                # The year's table would need instants outside the datetime range
+                document[field] = convert_to_user_timezone(value, user_timezone)
+                continue
+            table = tables.get(value.year)
+            if table is None:
+                table = tables[value.year] = zone_offset_table(user_timezone, value.year)
+            instants, tzinfos = table
+            document[field] = value.astimezone(tzinfos[bisect.bisect_right(instants, value) - 1])
+    return documents
 
 # Optimized date processing for output
-def process_dates_for_output(data, user_timezone):
-    """Process all date fields in data for output to user's timezone"""
-    # For lists of items, process them in a more optimized way
+def process_dates_for_output(data, user_timezone, model: Optional[Type[BaseModel]] = None):
+    """Process all date fields in data for output to user's timezone.
+    
+    Pass the response model for lists so the date fields come from its schema.
+    """
+    # Convert pages of documents in one pass
     if isinstance(data, list) and data and isinstance(data[0], dict):
-        date_fields = set()
-        # Find date fields from first item
-        for key, value in data[0].items():
-            if isinstance(value, datetime):
-                date_fields.add(key)
-        
-        # Process date fields for all items in batch
-        for item in data:
-            for field in date_fields:
-                if field in item and item[field]:
-                    item[field] = convert_to_user_timezone(item[field], user_timezone)
-        return data
+        if model is not None:
+            fields = datetime_fields(model)
+        else:
+            fields = {key for item in data for key, value in item.items() if isinstance(value, datetime)}
+        return convert_documents_to_timezone(data, user_timezone, fields)
     
     # Process dictionaries
     elif isinstance(data, dict):
@@ -484,34 +1431,244 @@ def generate_random_token(length=64):
 def generate_short_link(length=8):
     return ''.join(secrets.choice(string.ascii_letters + string.digits) for _ in range(length))
 
-# Email sending function
-async def send_email(to_email: str, subject: str, html_content: str):
-    # Replace with your email configuration
-    smtp_server = os.getenv("SMTP_SERVER", "smtp.gmail.com")
-    smtp_port = int(os.getenv("SMTP_PORT", "587"))
-    smtp_username = os.getenv("SMTP_USERNAME", "your-email@gmail.com")
-    smtp_password = os.getenv("SMTP_PASSWORD", "your-app-password")
-    
+# Email sending - pooled, authenticated SMTP connections reused across messages
+SMTP_SERVER = os.getenv("SMTP_SERVER", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+SMTP_USERNAME = os.getenv("SMTP_USERNAME", "your-email@gmail.com")
+SMTP_PASSWORD = os.getenv("SMTP_PASSWORD", "your-app-password")
+SMTP_FROM = os.getenv("SMTP_FROM", SMTP_USERNAME)
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "true").lower() == "true"
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", "3"))
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "10"))
+
+class SMTPPool:
+    def __init__(self, hostname: str, port: int, username: str, password: str, size: int, start_tls: bool, timeout: float):
+        self.hostname = hostname
+        self.port = port
+        self.username = username
+        self.password = password
+        self.size = size
+        self.start_tls = start_tls
+        self.timeout = timeout
+        self._idle = []
+        self._semaphore = asyncio.Semaphore(size)
+        self.in_flight = 0
+        self.sent = 0
+        self.failed = 0
+        self.connections_opened = 0
+        self.reconnects = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        connection = aiosmtplib.SMTP(
+            hostname=self.hostname,
+            port=self.port,
+            start_tls=self.start_tls,
+            timeout=self.timeout
+        )
+        await connection.connect()
+        # Local sinks usually run without authentication
+        if self.username and self.password:
+            await connection.login(self.username, self.password)
+        self.connections_opened += 1
+        return connection
+
+    async def send(self, message) -> None:
+        # The semaphore caps concurrent SMTP sessions at the pool size
+        async with self._semaphore:
+            self.in_flight += 1
+            started = time.perf_counter()
+            connection = self._idle.pop() if self._idle else None
+            try:
+                if connection is None or not connection.is_connected:
+                    connection = await self._connect()
+                try:
+                    await connection.send_message(message)
+                except aiosmtplib.SMTPServerDisconnected:
+                    # The server closed an idle connection, retry once on a fresh one
+                    self.reconnects += 1
+                    connection = await self._connect()
+                    await connection.send_message(message)
+                self._idle.append(connection)
+                self.sent += 1
+            except Exception:
+                self.failed += 1
+                if connection is not None:
+                    connection.close()
+                raise
+            finally:
+                self.in_flight -= 1
+                elapsed = time.perf_counter() - started
+                self.total_seconds += elapsed
+                self.max_seconds = max(self.max_seconds, elapsed)
+
+    async def close(self):
+        while self._idle:
+            connection = self._idle.pop()
+            try:
+                await connection.quit()
+            except Exception:
+                connection.close()
+
+    def stats(self) -> dict:
+        attempts = self.sent + self.failed
+        return {
+            "pool_size": self.size,
+            "idle_connections": len(self._idle),
+            "in_flight": self.in_flight,
+            "sent": self.sent,
+            "failed": self.failed,
+            "connections_opened": self.connections_opened,
+            "reconnects": self.reconnects,
+            "avg_send_seconds": (self.total_seconds / attempts) if attempts else 0.0,
+            "max_send_seconds": self.max_seconds
+        }
+
+SMTP_POOL = SMTPPool(
+    SMTP_SERVER, SMTP_PORT, SMTP_USERNAME, SMTP_PASSWORD,
+    size=SMTP_POOL_SIZE, start_tls=SMTP_STARTTLS, timeout=SMTP_TIMEOUT
+)
+METRICS_PROVIDERS["smtp"] = SMTP_POOL.stats
+
+def build_email_message(to_email: str, subject: str, html_content: str) -> MIMEMultipart:
     # Create message
     msg = MIMEMultipart()
-    msg['From'] = smtp_username
+    msg['From'] = SMTP_FROM
     msg['To'] = to_email
     msg['Subject'] = subject
     
     # Add HTML content
     msg.attach(MIMEText(html_content, 'html'))
-    
+    return msg
+
+# Durable email outbox: handlers insert, the dispatcher sends with retries
+EMAIL_OUTBOX_BATCH_SIZE = int(os.getenv("EMAIL_OUTBOX_BATCH_SIZE", "50"))
+EMAIL_OUTBOX_RATE = float(os.getenv("EMAIL_OUTBOX_RATE", "5"))  # messages per second, 0 pauses sending
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv("EMAIL_OUTBOX_MAX_ATTEMPTS", "6"))
+EMAIL_OUTBOX_BASE_BACKOFF = 30  # seconds, doubled after every failed attempt
+EMAIL_OUTBOX_MAX_BACKOFF = 60 * 60
+EMAIL_OUTBOX_POLL_INTERVAL = 5  # seconds, picks up mail queued by other workers
+EMAIL_OUTBOX_RETENTION = timedelta(days=7)  # sent/failed mail is kept this long for dedupe
+EMAIL_OUTBOX_CLAIM_TIMEOUT = timedelta(minutes=5)
+EMAIL_OUTBOX_WAKEUP = asyncio.Event()
+EMAIL_OUTBOX_STATS = {"enqueued": 0, "deduplicated": 0, "sent": 0, "retried": 0, "failed": 0}
+METRICS_PROVIDERS["email_outbox"] = lambda: dict(EMAIL_OUTBOX_STATS)
+
+def outbox_message(to_email: str, subject: str, html_content: str, idempotency_key: Optional[str] = None) -> dict:
+    now_utc = datetime.now(timezone.utc)
+    return {
+        "idempotency_key": idempotency_key or uuid.uuid4().hex,
+        "to": to_email,
+        "subject": subject,
+        "html": html_content,
+        "status": "pending",
+        "attempts": 0,
+        "next_attempt_at": now_utc,
+        "created_at": now_utc
+    }
+
+async def enqueue_emails(messages: List[dict]) -> int:
+    """Insert outbox messages, silently skipping idempotency keys already queued"""
+    if not messages:
+        return 0
+    try:
+        result = await db.email_outbox.insert_many(messages, ordered=False)
+        inserted = len(result.inserted_ids)
+    except BulkWriteError as e:
+        if any(error["code"] != 11000 for error in e.details.get("writeErrors", [])):
+            raise
+        inserted = e.details.get("nInserted", 0)
+    EMAIL_OUTBOX_STATS["enqueued"] += inserted
+    EMAIL_OUTBOX_STATS["deduplicated"] += len(messages) - inserted
+    EMAIL_OUTBOX_WAKEUP.set()
+    return inserted
+
+async def enqueue_email(to_email: str, subject: str, html_content: str, idempotency_key: Optional[str] = None) -> bool:
+    return await enqueue_emails([outbox_message(to_email, subject, html_content, idempotency_key)]) == 1
+
+async def deliver_outbox_message(message: dict):
     try:
-        # Connect to server and send email
-        server = smtplib.SMTP(smtp_server, smtp_port)
-        server.starttls()
-        server.login(smtp_username, smtp_password)
-        server.send_message(msg)
-        server.quit()
-        return True
+        await SMTP_POOL.send(build_email_message(message["to"], message["subject"], message["html"]))
     except Exception as e:
-        logger.error(f"Error sending email: {str(e)}")
-        return False
+        attempts = message["attempts"] + 1
+        now_utc = datetime.now(timezone.utc)
+        if attempts >= EMAIL_OUTBOX_MAX_ATTEMPTS:
+            EMAIL_OUTBOX_STATS["failed"] += 1
+            logger.error(f"Giving up on email to {message['to']} after {attempts} attempts: {str(e)}")
+            update = {"status": "failed", "expire_at": now_utc + EMAIL_OUTBOX_RETENTION}
+        else:
+            EMAIL_OUTBOX_STATS["retried"] += 1
+            backoff = min(EMAIL_OUTBOX_BASE_BACKOFF * 2 ** (attempts - 1), EMAIL_OUTBOX_MAX_BACKOFF)
+            backoff *= random.uniform(0.8, 1.2)
+            update = {"status": "pending", "next_attempt_at": now_utc + timedelta(seconds=backoff)}
+        await db.email_outbox.update_one(
+            {"_id": message["_id"]},
+            {"$set": {**update, "attempts": attempts, "last_error": str(e)}, "$unset": {"claim_id": "", "claimed_at": ""}}
+        )
+        return
+    
+    EMAIL_OUTBOX_STATS["sent"] += 1
+    now_utc = datetime.now(timezone.utc)
+    await db.email_outbox.update_one(
+        {"_id": message["_id"]},
+        {
+            "$set": {"status": "sent", "sent_at": now_utc, "expire_at": now_utc + EMAIL_OUTBOX_RETENTION},
+            "$inc": {"attempts": 1},
+            "$unset": {"claim_id": "", "claimed_at": "", "html": ""}
+        }
+    )
+
+async def dispatch_email_batch() -> int:
+    """Claim one batch of due outbox messages and send them, returns the number claimed"""
+    if EMAIL_OUTBOX_RATE <= 0:
+        # Paused, messages stay pending until sending is resumed
+        return 0
+    now_utc = datetime.now(timezone.utc)
+    due = await db.email_outbox.find(
+        {"status": "pending", "next_attempt_at": {"$lte": now_utc}},
+        {"_id": 1}
+    ).sort("next_attempt_at", ASCENDING).limit(EMAIL_OUTBOX_BATCH_SIZE).to_list(EMAIL_OUTBOX_BATCH_SIZE)
+    if not due:
+        return 0
+    
+    claim_id = uuid.uuid4().hex
+    await db.email_outbox.update_many(
+        {"_id": {"$in": [message["_id"] for message in due]}, "status": "pending"},
+        {"$set": {"status": "sending", "claim_id": claim_id, "claimed_at": now_utc}}
+    )
+    claimed = await db.email_outbox.find({"claim_id": claim_id}).to_list(None)
+    
+    # Start sends at EMAIL_OUTBOX_RATE, the SMTP pool bounds how many run at once
+    sends = []
+    for message in claimed:
+        sends.append(asyncio.create_task(deliver_outbox_message(message)))
+        await asyncio.sleep(1 / EMAIL_OUTBOX_RATE)
+    await asyncio.gather(*sends)
+    return len(due)
+
+async def run_email_dispatcher():
+    while True:
+        EMAIL_OUTBOX_WAKEUP.clear()
+        try:
+            # Messages left behind by a worker that died mid-send
+            await db.email_outbox.update_many(
+                {"status": "sending", "claimed_at": {"$lt": datetime.now(timezone.utc) - EMAIL_OUTBOX_CLAIM_TIMEOUT}},
+                {"$set": {"status": "pending"}, "$unset": {"claim_id": "", "claimed_at": ""}}
+            )
+            while await dispatch_email_batch() >= EMAIL_OUTBOX_BATCH_SIZE:
+                pass
+        except Exception as e:
+            logger.error(f"Error dispatching emails: {str(e)}")
+        
+        try:
+            await asyncio.wait_for(EMAIL_OUTBOX_WAKEUP.wait(), timeout=EMAIL_OUTBOX_POLL_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+
+# Singleton background jobs, run only by the leader lease holder
+LEADER_LEASE = LeaderLease("background-jobs", LEADER_LEASE_TTL, jobs=[start_ping_task, check_upcoming_due_dates, run_email_dispatcher])
+METRICS_PROVIDERS["leader_lease"] = LEADER_LEASE.stats
 
 # Models for notifications
 class NotificationResponse(BaseModel):
@@ -565,6 +1722,7 @@ class UserResponse(BaseModel):
     timezone: str = DEFAULT_TIMEZONE
     created_at: datetime
     is_verified: bool = False
+    reminder_mode: str = "immediate"
 
     class Config:
         allow_population_by_field_name = True
@@ -575,12 +1733,19 @@ class UserUpdate(BaseModel):
     name: Optional[str] = None
     email: Optional[EmailStr] = None
     timezone: Optional[str] = None
+    reminder_mode: Optional[str] = None  # immediate, digest
     
     @validator('timezone')
     def validate_timezone(cls, v):
         if v is not None and v not in VALID_TIMEZONES:
             raise ValueError(f'Invalid timezone. Please use a valid timezone identifier.')
         return v
+    
+    @validator('reminder_mode')
+    def validate_reminder_mode(cls, v):
+        if v is not None and v not in ["immediate", "digest"]:
+            raise ValueError('Reminder mode must be immediate or digest')
+        return v
 
 class Token(BaseModel):
     access_token: str
@@ -901,6 +2066,70 @@ class StatisticsResponse(BaseModel):
         arbitrary_types_allowed = True
         json_encoders = {ObjectId: str}
         
+class DashboardResponse(BaseModel):
+    user: UserResponse
+    statistics: StatisticsResponse
+    upcoming_assignments: List[AssignmentResponse]
+    upcoming_events: List[EventResponse]
+    recent_materials: List[MaterialResponse]
+
+# One assignment on a share link, only what the link holder is meant to see
+class SharedAssignmentResponse(BaseModel):
+    id: str = Field(alias="_id")
+    title: str
+    description: Optional[str] = None
+    due_date: datetime
+    subject_id: Optional[str] = None
+    priority: str
+    status: str
+    subject_name: str
+
+    class Config:
+        allow_population_by_field_name = True
+
+class BatchItem(BaseModel):
+    id: Optional[str] = None
+    method: str = "GET"
+    path: str
+    headers: Dict[str, str] = {}
+    body: Optional[Any] = None
+    
+    @validator('method')
+    def validate_method(cls, v):
+        v = v.upper()
+        if v not in BATCH_METHODS:
+            raise ValueError(f'Method must be one of {", ".join(BATCH_METHODS)}')
+        return v
+    
+    @validator('path')
+    def validate_path(cls, v):
+        if not v.startswith("/") or v.split("?")[0].rstrip("/") == "/batch":
+            raise ValueError('Path must be an API path other than /batch')
+        if v.startswith(BATCH_EXCLUDED_PATHS):
+            raise ValueError('File downloads and exports cannot be batched')
+        return v
+
+class BatchRequest(BaseModel):
+    requests: List[BatchItem]
+    
+    @validator('requests')
+    def validate_requests(cls, v):
+        if not v:
+            raise ValueError('At least one request is required')
+        if len(v) > BATCH_MAX_REQUESTS:
+            raise ValueError(f'At most {BATCH_MAX_REQUESTS} requests per batch')
+        return v
+
+class BatchResult(BaseModel):
+    id: Optional[str] = None
+    status: int
+    headers: Dict[str, str]
+    body: Optional[Any] = None
+    body_encoding: Optional[str] = None  # "base64" for bodies that aren't JSON or text
+
+class BatchResponse(BaseModel):
+    responses: List[BatchResult]
+
 # Authentication Functions - reduced bcrypt rounds for better performance
 def hash_password(password: str) -> str:
     salt = bcrypt.gensalt(rounds=10)  # Reduced from default 12 to 10 for better performance
@@ -910,16 +2139,350 @@ def hash_password(password: str) -> str:
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return bcrypt.checkpw(plain_password.encode(), hashed_password.encode())
 
-def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
+# bcrypt releases the GIL, so a small thread pool keeps hashing off the event loop
+class PasswordHashPool:
+    def __init__(self, max_workers: int, max_queue: int):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bcrypt")
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_seconds = 0.0
+
+    async def run(self, func, *args):
+        # Fail fast instead of letting a login burst queue up unbounded work
+        if self.in_flight >= self.max_workers + self.max_queue:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Server is busy, please try again shortly",
+                headers={"Retry-After": "1"}
+            )
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        started = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+            self.total_seconds += time.perf_counter() - started
+
+    def stats(self) -> dict:
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queue_depth": max(0, self.in_flight - self.max_workers),
+            "peak_in_flight": self.peak_in_flight,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_seconds": (self.total_seconds / self.completed) if self.completed else 0.0
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+PASSWORD_HASH_POOL = PasswordHashPool(
+    max_workers=int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1)))),
+    max_queue=int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "64"))
+)
+METRICS_PROVIDERS["password_hash_pool"] = PASSWORD_HASH_POOL.stats
+
+async def hash_password_async(password: str) -> str:
+    return await PASSWORD_HASH_POOL.run(hash_password, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await PASSWORD_HASH_POOL.run(verify_password, plain_password, hashed_password)
+
+def create_access_token(data: dict, expires_delta: Optional[timedelta] = None, user: Optional[dict] = None):
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.now(timezone.utc) + expires_delta
     else:
         expire = datetime.now(timezone.utc) + timedelta(minutes=JWT_EXPIRATION_MINUTES)
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "iat": datetime.now(timezone.utc)})
+    # Embed profile claims so get_current_user can skip the users lookup
+    if user is not None:
+        to_encode.update(build_user_claims(user))
     encoded_jwt = jwt.encode(to_encode, JWT_SECRET, algorithm=JWT_ALGORITHM)
     return encoded_jwt
 
+def build_user_claims(user: dict) -> dict:
+    created_at = user.get("created_at")
+    return {
+        "name": user.get("name"),
+        "tz": user.get("timezone", DEFAULT_TIMEZONE),
+        "verified": user.get("is_verified", False),
+        "rm": user.get("reminder_mode", "immediate"),
+        "created_at": created_at.isoformat() if created_at else None,
+        "ver": user.get("token_version", 0)
+    }
+
+def user_from_claims(payload: dict) -> dict:
+    created_at = payload.get("created_at")
+    return {
+        "_id": ObjectId(payload["user_id"]),
+        "email": payload["sub"],
+        "name": payload.get("name"),
+        "timezone": payload.get("tz", DEFAULT_TIMEZONE),
+        "is_verified": payload.get("verified", False),
+        "reminder_mode": payload.get("rm", "immediate"),
+        "created_at": datetime.fromisoformat(created_at) if created_at else None
+    }
+
+# Per-user token_version, bumped whenever embedded claims go stale or tokens are revoked
+TOKEN_VERSION_TTL = 30  # seconds, bounds how long another worker may trust stale claims
+TOKEN_VERSION_CACHE = TTLCache(
+    "token_version",
+    max_size=int(os.getenv("TOKEN_VERSION_CACHE_SIZE", "20000")),
+    ttl=TOKEN_VERSION_TTL
+)
+METRICS_PROVIDERS["token_version_cache"] = TOKEN_VERSION_CACHE.stats
+
+async def get_token_version(user_id: str) -> Optional[int]:
+    version = TOKEN_VERSION_CACHE.get(user_id)
+    if version is not None:
+        return version
+    user = await db.users.find_one({"_id": ObjectId(user_id)}, {"token_version": 1})
+    if user is None:
+        return None
+    version = user.get("token_version", 0)
+    TOKEN_VERSION_CACHE.set(user_id, version)
+    return version
+
+async def bump_token_version(user_id, revoke: bool = False):
+    """Invalidate the claims embedded in a user's tokens; revoke=True also rejects the tokens"""
+    update = {"$inc": {"token_version": 1}}
+    if revoke:
+        update["$set"] = {"tokens_revoked_at": datetime.now(timezone.utc)}
+    await db.users.update_one({"_id": ObjectId(user_id)}, update)
+    TOKEN_VERSION_CACHE.invalidate(str(user_id))
+    invalidate_user_caches(user_id)
+
+# Per-user, per-collection change versions, bumped by every write endpoint
+CHANGE_VERSION_TTL = 5  # seconds, bounds how long another worker may serve a stale version
+CHANGE_VERSIONS = TTLCache(
+    "change_versions",
+    max_size=int(os.getenv("CHANGE_VERSION_CACHE_SIZE", "20000")),
+    ttl=CHANGE_VERSION_TTL
+)
+METRICS_PROVIDERS["change_versions"] = CHANGE_VERSIONS.stats
+
+async def get_change_versions(user_id, fresh: bool = False) -> dict:
+    """Change versions of a user, `fresh` skips this worker's cache for callers that must see other workers' writes"""
+    cache_key = str(user_id)
+    versions = None if fresh else CHANGE_VERSIONS.get(cache_key)
+    if versions is not None:
+        return versions
+    versions = await db.change_versions.find_one({"_id": ObjectId(user_id)}) or {}
+    versions.pop("_id", None)
+    CHANGE_VERSIONS.set(cache_key, versions)
+    return versions
+
+async def bump_change_version(user_id, *collections: str):
+    versions = await db.change_versions.find_one_and_update(
+        {"_id": ObjectId(user_id)},
+        {"$inc": {collection: 1 for collection in collections}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    versions.pop("_id", None)
+    CHANGE_VERSIONS.set(str(user_id), versions)
+
+async def bump_change_versions_many(user_ids, *collections: str):
+    """bump_change_version for many users in one round trip, used by background jobs"""
+    user_ids = {str(user_id) for user_id in user_ids}
+    if not user_ids:
+        return
+    await db.change_versions.bulk_write([
+        UpdateOne({"_id": ObjectId(user_id)}, {"$inc": {collection: 1 for collection in collections}}, upsert=True)
+        for user_id in user_ids
+    ], ordered=False)
+    for user_id in user_ids:
+        CHANGE_VERSIONS.invalidate(user_id)
+
+# Conditional GET for list endpoints, strong ETags from the change versions of what they read
+LIST_ETAG_SALT = "1"  # bump when the list response format changes
+
+def etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+def conditional_list(*collections: str):
+    """Answer 304 from the change versions alone, without querying the collection.
+    
+    The endpoint must take `request`, `response` and `current_user`. Place it below
+    @limiter.limit and above @cache.
+    """
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            request, response, current_user = kwargs["request"], kwargs["response"], kwargs["current_user"]
+            # A write may have gone through another worker, a 304 must never hide it.
+            # Refreshing also hands the current versions to the @cache key below.
+            versions = await get_change_versions(current_user["_id"], fresh=True)
+            generation = ".".join(str(versions.get(collection, 0)) for collection in collections)
+            query = "&".join(sorted(f"{name}={value}" for name, value in request.query_params.multi_items()))
+            fingerprint = f"{LIST_ETAG_SALT}:{request.url.path}:{current_user['_id']}:{current_user.get('timezone', DEFAULT_TIMEZONE)}:{generation}:{query}"
+            etag = f'"{hashlib.sha1(fingerprint.encode()).hexdigest()}"'
+            headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+            if etag_matches(request, etag):
+                return Response(status_code=304, headers=headers)
+            result = await func(*args, **kwargs)
+            # Endpoints on the fast list path return their own response object
+            (result if isinstance(result, Response) else response).headers.update(headers)
+            return result
+
+        return wrapper
+    return decorator
+
+# Keyset pagination, a cursor holds the (sort key, _id) of the last item of a page
+def encode_cursor(document: dict, sort_field: str) -> str:
+    value = document.get(sort_field)
+    if isinstance(value, datetime):
+        value = {"$date": as_utc(value).isoformat()}
+    raw = orjson.dumps([value, str(document["_id"])])
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str):
+    try:
+        value, last_id = orjson.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if isinstance(value, dict):
+            value = datetime.fromisoformat(value["$date"])
+        return value, ObjectId(last_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def keyset_filter(sort_field: str, direction: int, cursor: str) -> dict:
+    """Everything strictly after the cursor in (sort_field, _id) order, nulls sort lowest"""
+    value, last_id = decode_cursor(cursor)
+    after = "$gt" if direction == ASCENDING else "$lt"
+    if value is None:
+        if direction == ASCENDING:
+            return {"$or": [{sort_field: None, "_id": {"$gt": last_id}}, {sort_field: {"$ne": None}}]}
+        return {sort_field: None, "_id": {"$lt": last_id}}
+    clauses = [{sort_field: {after: value}}, {sort_field: value, "_id": {after: last_id}}]
+    if direction != ASCENDING:
+        clauses.append({sort_field: None})
+    return {"$or": clauses}
+
+async def find_page(collection, query: dict, sort_field: str, direction: int, response: Response,
+                    limit: int, skip: int = 0, cursor: Optional[str] = None,
+                    projection: Optional[dict] = None) -> list:
+    """One page of a list endpoint, the cursor for the next page goes in X-Next-Cursor.
+    
+    With a cursor the page starts right after it through the (user_id, sort key, _id)
+    index, so deep pages cost the same as the first one. `skip` is kept for old clients.
+    """
+    if cursor:
+        query = {**query, "$and": query.get("$and", []) + [keyset_filter(sort_field, direction, cursor)]}
+    if projection is not None:
+        # The sort key is needed for the next cursor even when it isn't returned
+        projection = {**projection, sort_field: 1}
+    find = collection.find(query, projection).sort([(sort_field, direction), ("_id", direction)])
+    if skip and not cursor:
+        find = find.skip(skip)
+    if limit <= 0:
+        # 0 has always meant no limit, so there is no next page
+        return await find.to_list(None)
+    documents = await find.limit(limit + 1).to_list(limit + 1)
+    if len(documents) > limit:
+        documents = documents[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(documents[-1], sort_field)
+    return documents
+
+# Fast list serialization, Mongo documents go straight to orjson without building response models
+def compile_encoder(model: Type[BaseModel]):
+    """Map a document to the JSON shape FastAPI produces for `model` (aliases, ids as strings)"""
+    plan = []
+    for field in model.__fields__.values():
+        convert = None
+        if isinstance(field.type_, type) and issubclass(field.type_, (PyObjectId, ObjectId)):
+            convert = str
+        elif isinstance(field.type_, type) and issubclass(field.type_, BaseModel):
+            convert = compile_encoder(field.type_)
+        elif field.type_ is float:
+            convert = float
+        if convert is not None and field.shape != SHAPE_SINGLETON:
+            convert = (lambda item_convert: lambda values: [item_convert(value) for value in values])(convert)
+        plan.append((field.alias, field.name, convert, field))
+    
+    def encode(document: dict) -> dict:
+        encoded = {}
+        for alias, name, convert, field in plan:
+            if alias in document:
+                value = document[alias]
+            elif name in document:
+                value = document[name]
+            else:
+                encoded[alias] = field.get_default()
+                continue
+            encoded[alias] = convert(value) if convert is not None and value is not None else value
+        return encoded
+    
+    return encode
+
+RESPONSE_ENCODERS = {}
+
+class DocumentListResponse(ORJSONResponse):
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, default=orjson_default, option=orjson.OPT_NON_STR_KEYS)
+
+def list_response(model: Type[BaseModel], documents: list, response: Response) -> DocumentListResponse:
+    """Returned by list endpoints in place of the documents.
+    
+    FastAPI passes response objects through untouched, so the route's response_model
+    only documents the schema. Headers already set on `response` are carried over.
+    """
+    encode = RESPONSE_ENCODERS.get(model)
+    if encode is None:
+        encode = RESPONSE_ENCODERS[model] = compile_encoder(model)
+    headers = {name: value for name, value in response.headers.items() if name != "content-length"}
+    return DocumentListResponse([encode(document) for document in documents], headers=headers)
+
+def document_response(model: Type[BaseModel], document: dict, response: Response) -> DocumentListResponse:
+    """Single document counterpart of list_response"""
+    encode = RESPONSE_ENCODERS.get(model)
+    if encode is None:
+        encode = RESPONSE_ENCODERS[model] = compile_encoder(model)
+    headers = {name: value for name, value in response.headers.items() if name != "content-length"}
+    return DocumentListResponse(encode(document), headers=headers)
+
+# Sparse fieldsets, ?fields=title,due_date trims both the Mongo projection and the response model
+FIELDS_QUERY = Query(None, description="Comma separated fields to return, e.g. title,due_date. The id is always included.")
+TRIMMED_MODELS = {}
+
+def select_fields(model: Type[BaseModel], fields: Optional[str]) -> Tuple[Type[BaseModel], Optional[dict]]:
+    """Response model and Mongo projection for a fields parameter, the full model and no projection without one"""
+    if not fields:
+        return model, None
+    by_name = {}
+    for field in model.__fields__.values():
+        by_name[field.name] = by_name[field.alias] = field
+    selected = {"id"} if "id" in model.__fields__ else set()
+    for name in fields.split(","):
+        name = name.strip()
+        if not name:
+            continue
+        if name not in by_name:
+            raise HTTPException(status_code=400, detail=f"Unknown field: {name}")
+        selected.add(by_name[name].name)
+    key = (model, tuple(name for name in model.__fields__ if name in selected))
+    trimmed = TRIMMED_MODELS.get(key)
+    if trimmed is None:
+        trimmed = TRIMMED_MODELS[key] = create_model(
+            f"{model.__name__}Fields",
+            __config__=model.__config__,
+            **{name: (model.__fields__[name].outer_type_, model.__fields__[name].field_info) for name in key[1]}
+        )
+    return trimmed, {model.__fields__[name].alias: 1 for name in key[1]}
+
 # Optimized get_current_user with JWT caching
 async def get_current_user(token: str = Depends(oauth2_scheme)):
     credentials_exception = HTTPException(
@@ -929,8 +2492,9 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
     )
     
     # Check cache first
-    if token in JWT_CACHE and JWT_CACHE[token]["expire_time"] > time.time():
-        return JWT_CACHE[token]["user"]
+    cached_user = JWT_CACHE.get(token)
+    if cached_user is not None:
+        return cached_user
     
     try:
         payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
@@ -939,14 +2503,26 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         if email is None or user_id is None:
             raise credentials_exception
         
-        # Get user with projection to fetch only needed fields
-        user = await db.users.find_one(
-            {"_id": ObjectId(user_id)},
-            {"email": 1, "name": 1, "timezone": 1, "is_verified": 1, "created_at": 1}
-        )
-        
-        if user is None:
-            raise credentials_exception
+        # Fast path: claims are still current, no users lookup needed
+        if "ver" in payload and await get_token_version(user_id) == payload["ver"]:
+            user = user_from_claims(payload)
+        else:
+            # Get user with projection to fetch only needed fields
+            user = await db.users.find_one(
+                {"_id": ObjectId(user_id)},
+                {**USER_CACHE_PROJECTION, "tokens_revoked_at": 1}
+            )
+            
+            if user is None:
+                raise credentials_exception
+            
+            # Tokens issued before a password reset are revoked
+            revoked_at = user.pop("tokens_revoked_at", None)
+            if revoked_at is not None:
+                if revoked_at.tzinfo is None:
+                    revoked_at = revoked_at.replace(tzinfo=timezone.utc)
+                if payload.get("iat", 0) < int(revoked_at.timestamp()):
+                    raise credentials_exception
         
         # Check if user is verified
         if not user.get("is_verified", False):
@@ -955,28 +2531,23 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
                 detail="Email not verified. Please verify your email before accessing this resource."
             )
         
-        # Cache the result
-        JWT_CACHE[token] = {
-            "user": user,
-            "expire_time": time.time() + JWT_CACHE_TTL
-        }
+        # Cache the result, tagged by user so it can be invalidated on change
+        JWT_CACHE.set(token, user, tag=str(user["_id"]))
         
         return user
-    except jwt.PyJWTError:
+    except (jwt.PyJWTError, InvalidId):
         raise credentials_exception
 
 # Get cached user function
 async def get_cached_user(user_id):
     cache_key = str(user_id)
-    if cache_key in USER_CACHE and USER_CACHE[cache_key]["expire_time"] > time.time():
-        return USER_CACHE[cache_key]["data"]
+    user = USER_CACHE.get(cache_key)
+    if user is not None:
+        return user
     
-    user = await db.users.find_one({"_id": ObjectId(user_id)})
+    user = await db.users.find_one({"_id": ObjectId(user_id)}, USER_CACHE_PROJECTION)
     if user:
-        USER_CACHE[cache_key] = {
-            "data": user,
-            "expire_time": time.time() + USER_CACHE_TTL
-        }
+        USER_CACHE.set(cache_key, user)
     return user
 
 # Authentication endpoints
@@ -995,7 +2566,7 @@ async def register_user(request: Request, user: UserCreate):
         raise HTTPException(status_code=400, detail="Email already registered")
     
     # Hash password
-    hashed_password = hash_password(user.password)
+    hashed_password = await hash_password_async(user.password)
     
     # Set default timezone if not provided
     if not user.timezone:
@@ -1051,12 +2622,13 @@ async def register_user(request: Request, user: UserCreate):
     </html>
     '''
     
-    # Send email in background
-    asyncio.create_task(send_email(
-        to_email=user.email,
-        subject="Verify Your Email - Student Dashboard",
-        html_content=email_content
-    ))
+    # Queue email in the outbox
+    await enqueue_email(
+        user.email,
+        "Verify Your Email - Student Dashboard",
+        email_content,
+        idempotency_key=f"verify:{verification_token}"
+    )
     
     # Return created user without password
     created_user = await db.users.find_one({"_id": result.inserted_id})
@@ -1085,6 +2657,8 @@ async def verify_email(request: Request, verification: VerifyToken):
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
     
+    invalidate_user_caches(token_data["user_id"])
+    
     # Delete used token
     await db.email_verification.delete_one({"token": verification.token})
     
@@ -1136,12 +2710,13 @@ async def resend_verification(request: Request, email_data: EmailVerify):
     </html>
     '''
     
-    # Send email in background
-    asyncio.create_task(send_email(
-        to_email=email_data.email,
-        subject="Verify Your Email - Student Dashboard",
-        html_content=email_content
-    ))
+    # Queue email in the outbox
+    await enqueue_email(
+        email_data.email,
+        "Verify Your Email - Student Dashboard",
+        email_content,
+        idempotency_key=f"verify:{verification_token}"
+    )
     
     return {"message": "If your email exists in our system, a verification link has been sent."}
 
@@ -1187,12 +2762,13 @@ async def forgot_password(request: Request, password_data: PasswordReset):
     </html>
     '''
     
-    # Send email in background
-    asyncio.create_task(send_email(
-        to_email=password_data.email,
-        subject="Password Reset - Student Dashboard",
-        html_content=email_content
-    ))
+    # Queue email in the outbox
+    await enqueue_email(
+        password_data.email,
+        "Password Reset - Student Dashboard",
+        email_content,
+        idempotency_key=f"reset:{reset_token}"
+    )
     
     return {"message": "If your email exists in our system, a password reset link has been sent."}
 
@@ -1210,7 +2786,7 @@ async def reset_password(request: Request, reset_data: ResetPassword):
         raise HTTPException(status_code=400, detail="Invalid or expired reset token")
     
     # Hash new password
-    hashed_password = hash_password(reset_data.new_password)
+    hashed_password = await hash_password_async(reset_data.new_password)
     
     # Update user's password
     result = await db.users.update_one(
@@ -1221,6 +2797,9 @@ async def reset_password(request: Request, reset_data: ResetPassword):
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
     
+    # Revoke every token issued before the reset
+    await bump_token_version(token_data["user_id"], revoke=True)
+    
     # Delete used token
     await db.password_reset.delete_one({"token": reset_data.token})
     
@@ -1232,7 +2811,7 @@ async def login_for_access_token(request: Request, form_data: OAuth2PasswordRequ
     # Find user by email
     user = await db.users.find_one({"email": form_data.username})
     
-    if not user or not verify_password(form_data.password, user["password"]):
+    if not user or not await verify_password_async(form_data.password, user["password"]):
         raise HTTPException(
             status_code=401,
             detail="Incorrect email or password",
@@ -1250,7 +2829,8 @@ async def login_for_access_token(request: Request, form_data: OAuth2PasswordRequ
     access_token_expires = timedelta(minutes=JWT_EXPIRATION_MINUTES)
     access_token = create_access_token(
         data={"sub": user["email"], "user_id": str(user["_id"])},
-        expires_delta=access_token_expires
+        expires_delta=access_token_expires,
+        user=user
     )
     
     return {"access_token": access_token, "token_type": "bearer"}
@@ -1291,8 +2871,16 @@ async def create_assignment_share(
 # Get shared assignments - optimized version
 @app.get("/shared-assignments/{share_id}")
 @limiter.limit("30/minute")
-@cache(expire=300)  # Cache for 5 minutes
-async def get_shared_assignments(request: Request, share_id: str):
+@cache(expire=300, namespace="shared_assignments")  # Cache for 5 minutes
+@coalesce(namespace="shared_assignments")
+async def get_shared_assignments(request: Request, share_id: str, fields: Optional[str] = FIELDS_QUERY):
+    model, projection = select_fields(SharedAssignmentResponse, fields)
+    if projection is None:
+        projection = {name: 1 for name in ("title", "description", "due_date", "subject_id", "priority", "status")}
+    with_subject_name = projection.pop("subject_name", None) is not None or not fields
+    if with_subject_name:
+        projection["subject_id"] = 1
+    
     # Find share data
     share_data = await db.assignment_shares.find_one({
         "share_id": share_id,
@@ -1318,21 +2906,16 @@ async def get_shared_assignments(request: Request, share_id: str):
         "user_id": share_data["user_id"],
         "status": {"$ne": "completed"},
         "due_date": {"$gt": datetime.now(timezone.utc)}
-    }, {
-        "title": 1, 
-        "description": 1, 
-        "due_date": 1, 
-        "subject_id": 1,
-        "priority": 1,
-        "status": 1
-    }).sort("due_date", 1).to_list(100)
-    
-    # Get user's subjects with projection
-    subjects = await db.subjects.find({
-        "user_id": share_data["user_id"]
-    }, {
-        "name": 1
-    }).to_list(100)
+    }, projection).sort("due_date", 1).to_list(100)
+    
+    # Get user's subjects with projection, only needed for the subject names
+    subjects = []
+    if with_subject_name:
+        subjects = await db.subjects.find({
+            "user_id": share_data["user_id"]
+        }, {
+            "name": 1
+        }).to_list(100)
     
     subject_map = {str(subject["_id"]): subject["name"] for subject in subjects}
     
@@ -1349,8 +2932,11 @@ async def get_shared_assignments(request: Request, share_id: str):
         
         # Add subject name
         subject_id = str(assignment.get("subject_id", ""))
-        assignment["subject_name"] = subject_map.get(subject_id, "Unknown Subject")
+        if with_subject_name:
+            assignment["subject_name"] = subject_map.get(subject_id, "Unknown Subject")
         
+        if fields:
+            assignment = {field.alias: assignment[field.alias] for field in model.__fields__.values() if field.alias in assignment}
         processed_assignments.append(assignment)
     
     return {
@@ -1364,11 +2950,16 @@ async def get_shared_assignments(request: Request, share_id: str):
 @limiter.limit("60/minute")
 async def get_notifications(
     request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 20,
+    cursor: Optional[str] = None,
     unread_only: bool = False,
+    fields: Optional[str] = FIELDS_QUERY,
     current_user: dict = Depends(get_current_user)
 ):
+    model, projection = select_fields(NotificationResponse, fields)
+    
     # Build filter query
     query = {"user_id": ObjectId(current_user["_id"])}
     
@@ -1376,13 +2967,13 @@ async def get_notifications(
         query["read"] = False
     
     # Get notifications with filters
-    notifications = await db.notifications.find(query).sort("created_at", -1).skip(skip).limit(limit).to_list(limit)
+    notifications = await find_page(db.notifications, query, "created_at", DESCENDING, response, limit, skip, cursor, projection)
     
     # Convert dates to user timezone for response
     user_timezone = current_user.get("timezone", DEFAULT_TIMEZONE)
-    notifications = process_dates_for_output(notifications, user_timezone)
+    notifications = process_dates_for_output(notifications, user_timezone, NotificationResponse)
     
-    return notifications
+    return list_response(model, notifications, response)
 
 @app.put("/notifications/{notification_id}", response_model=NotificationResponse)
 @limiter.limit("60/minute")
@@ -1410,6 +3001,7 @@ async def mark_notification_read(
         {"_id": ObjectId(notification_id)},
         {"$set": update_data}
     )
+    await bump_change_version(current_user["_id"], "notifications")
     
     # Return updated notification
     updated_notification = await db.notifications.find_one({"_id": ObjectId(notification_id)})
@@ -1448,13 +3040,18 @@ async def mark_all_notifications_read(
         },
         {"$set": {"read": True}}
     )
+    await bump_change_version(current_user["_id"], "notifications")
     
     return {"marked_count": result.modified_count}
 
 @app.get("/users/me", response_model=UserResponse)
-async def read_users_me(current_user: dict = Depends(get_current_user)):
-    user_data = {**current_user}
-    return user_data
+async def read_users_me(
+    response: Response,
+    fields: Optional[str] = FIELDS_QUERY,
+    current_user: dict = Depends(get_current_user)
+):
+    model, _ = select_fields(UserResponse, fields)
+    return document_response(model, current_user, response)
 
 @app.put("/users/me", response_model=UserResponse)
 async def update_user(
@@ -1480,18 +3077,27 @@ async def update_user(
         {"$set": update_data}
     )
     
+    # Claims embedded in existing tokens are now stale
+    await bump_token_version(current_user["_id"])
+    await bump_change_version(current_user["_id"], "users")
+    
+    # Digest reminders are aligned to the user's local morning
+    if "reminder_mode" in update_data or "timezone" in update_data:
+        await realign_user_reminders(current_user["_id"])
+    
+    # Rollups are bucketed by local day, later writes must find their contribution under the new zone
+    old_timezone = current_user.get("timezone", DEFAULT_TIMEZONE)
+    if update_data.get("timezone", old_timezone) != old_timezone:
+        await rebuild_study_rollups(current_user["_id"])
+        await bump_change_version(current_user["_id"], "study_sessions")
+    
     # Return updated user
     updated_user = await db.users.find_one({"_id": ObjectId(current_user["_id"])})
     
-    # Clear user from cache
-    cache_key = str(current_user["_id"])
-    if cache_key in USER_CACHE:
-        del USER_CACHE[cache_key]
-    
     return updated_user
 
 @app.get("/timezones")
-@cache(expire=86400)  # Cache for 24 hours
+@cache(expire=86400, namespace="timezones")  # Cache for 24 hours
 async def get_timezones():
     """Return a list of valid timezones"""
     return {"timezones": VALID_TIMEZONES}
@@ -1507,44 +3113,53 @@ async def create_subject(request: Request, subject: SubjectCreate, current_user:
     }
     
     result = await db.subjects.insert_one(new_subject)
+    await bump_change_version(current_user["_id"], "subjects")
     created_subject = await db.subjects.find_one({"_id": result.inserted_id})
     
     return created_subject
 
 @app.get("/subjects", response_model=List[SubjectResponse])
 @limiter.limit("60/minute")
-@cache(expire=300)  # Cache for 5 minutes
+@conditional_list("subjects")
+@cache(expire=6 * 60 * 60, namespace="subjects", key_builder=user_cache_key_builder)  # Invalidated on write
 async def get_subjects(
     request: Request,
+    response: Response,
     skip: int = 0, 
     limit: int = 100,
+    fields: Optional[str] = FIELDS_QUERY,
     current_user: dict = Depends(get_current_user)
 ):
+    model, projection = select_fields(SubjectResponse, fields)
     subjects = await db.subjects.find(
-        {"user_id": ObjectId(current_user["_id"])}
+        {"user_id": ObjectId(current_user["_id"])},
+        projection
     ).skip(skip).limit(limit).to_list(limit)
     
-    return subjects
+    return list_response(model, subjects, response)
 
 @app.get("/subjects/{subject_id}", response_model=SubjectResponse)
 @limiter.limit("60/minute")
 async def get_subject(
     request: Request,
+    response: Response,
     subject_id: str,
+    fields: Optional[str] = FIELDS_QUERY,
     current_user: dict = Depends(get_current_user)
 ):
+    model, projection = select_fields(SubjectResponse, fields)
     try:
         subject = await db.subjects.find_one({
             "_id": ObjectId(subject_id),
             "user_id": ObjectId(current_user["_id"])
-        })
+        }, projection)
     except InvalidId:
         raise HTTPException(status_code=400, detail="Invalid subject ID format")
     
     if not subject:
         raise HTTPException(status_code=404, detail="Subject not found")
     
-    return subject
+    return document_response(model, subject, response)
 
 @app.put("/subjects/{subject_id}", response_model=SubjectResponse)
 @limiter.limit("30/minute")
@@ -1574,6 +3189,7 @@ async def update_subject(
             {"_id": ObjectId(subject_id)},
             {"$set": update_data}
         )
+        await bump_change_version(current_user["_id"], "subjects")
     
     # Return updated subject
     updated_subject = await db.subjects.find_one({"_id": ObjectId(subject_id)})
@@ -1632,6 +3248,9 @@ async def delete_subject(
         {"$set": {"subject_id": None}}
     )
     
+    await move_subject_rollups(current_user["_id"], subject_id)
+    await bump_change_version(current_user["_id"], "subjects", "assignments", "events", "study_sessions", "materials", "goals", "notes")
+    
     return None
 
 # Assignment endpoints
@@ -1664,9 +3283,16 @@ async def create_assignment(
         "created_at": datetime.now(timezone.utc),
         "notification_sent": False
     }
+    # Assignments created as completed count towards the study rollups right away
+    if new_assignment["status"] == "completed":
+        new_assignment["completed_at"] = new_assignment["created_at"]
     
     result = await db.assignments.insert_one(new_assignment)
     created_assignment = await db.assignments.find_one({"_id": result.inserted_id})
+    # Rollups first, so nothing cached under the new version can hold the old totals
+    await apply_rollup_change(current_user["_id"], None, assignment_rollup(created_assignment, user_timezone))
+    await bump_change_version(current_user["_id"], "assignments")
+    await sync_reminder("assignment", created_assignment)
     
     # Convert dates back to user timezone for response
     created_assignment = process_dates_for_output(created_assignment, user_timezone)
@@ -1675,17 +3301,23 @@ async def create_assignment(
 
 @app.get("/assignments", response_model=List[AssignmentResponse])
 @limiter.limit("60/minute")
+@conditional_list("assignments")
 async def get_assignments(
     request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     status: Optional[str] = None,
     subject_id: Optional[str] = None,
     priority: Optional[str] = None,
     due_before: Optional[datetime] = None,
     due_after: Optional[datetime] = None,
+    fields: Optional[str] = FIELDS_QUERY,
     current_user: dict = Depends(get_current_user)
 ):
+    model, projection = select_fields(AssignmentResponse, fields)
+    
     # Get user timezone
     user_timezone = current_user.get("timezone", DEFAULT_TIMEZONE)
     
@@ -1722,25 +3354,28 @@ async def get_assignments(
         query["due_date"] = date_query
     
     # Get assignments with filters
-    assignments = await db.assignments.find(query).sort("due_date", 1).skip(skip).limit(limit).to_list(limit)
+    assignments = await find_page(db.assignments, query, "due_date", ASCENDING, response, limit, skip, cursor, projection)
     
     # Convert dates to user timezone for response
-    assignments = process_dates_for_output(assignments, user_timezone)
+    assignments = process_dates_for_output(assignments, user_timezone, AssignmentResponse)
     
-    return assignments
+    return list_response(model, assignments, response)
 
 @app.get("/assignments/{assignment_id}", response_model=AssignmentResponse)
 @limiter.limit("60/minute")
 async def get_assignment(
     request: Request,
+    response: Response,
     assignment_id: str,
+    fields: Optional[str] = FIELDS_QUERY,
     current_user: dict = Depends(get_current_user)
 ):
+    model, projection = select_fields(AssignmentResponse, fields)
     try:
         assignment = await db.assignments.find_one({
             "_id": ObjectId(assignment_id),
             "user_id": ObjectId(current_user["_id"])
-        })
+        }, projection)
     except InvalidId:
         raise HTTPException(status_code=400, detail="Invalid assignment ID format")
     
@@ -1751,7 +3386,7 @@ async def get_assignment(
     user_timezone = current_user.get("timezone", DEFAULT_TIMEZONE)
     assignment = process_dates_for_output(assignment, user_timezone)
     
-    return assignment
+    return document_response(model, assignment, response)
 
 @app.put("/assignments/{assignment_id}", response_model=AssignmentResponse)
 @limiter.limit("30/minute")
@@ -1791,6 +3426,13 @@ async def update_assignment(
     if "due_date" in update_data:
         update_data["due_date"] = convert_to_utc(update_data["due_date"], user_timezone)
     
+    # Record when the assignment was completed for the study rollups
+    unset_data = {}
+    if "status" in update_data and update_data["status"] == "completed" and assignment.get("status") != "completed":
+        update_data["completed_at"] = datetime.now(timezone.utc)
+    elif "status" in update_data and update_data["status"] != "completed":
+        unset_data["completed_at"] = ""
+    
     # If status is changed to completed, reset notification_sent
     if "status" in update_data and update_data["status"] == "completed":
         update_data["notification_sent"] = False
@@ -1801,14 +3443,28 @@ async def update_assignment(
     # Update assignment
     if update_data:
         update_data["updated_at"] = datetime.now(timezone.utc)
+        update_operation = {"$set": update_data}
+        if unset_data:
+            update_operation["$unset"] = unset_data
         await db.assignments.update_one(
             {"_id": ObjectId(assignment_id)},
-            {"$set": update_data}
+            update_operation
         )
     
     # Return updated assignment
     updated_assignment = await db.assignments.find_one({"_id": ObjectId(assignment_id)})
     
+    # Rollups first, so nothing cached under the new version can hold the old totals
+    await apply_rollup_change(
+        current_user["_id"],
+        assignment_rollup(assignment, user_timezone),
+        assignment_rollup(updated_assignment, user_timezone)
+    )
+    if update_data:
+        await bump_change_version(current_user["_id"], "assignments")
+    if "due_date" in update_data or "status" in update_data:
+        await sync_reminder("assignment", updated_assignment)
+    
     # Convert dates to user timezone for response
     updated_assignment = process_dates_for_output(updated_assignment, user_timezone)
     
@@ -1836,6 +3492,13 @@ async def delete_assignment(
     # Delete assignment
     await db.assignments.delete_one({"_id": ObjectId(assignment_id)})
     
+    # Rollups first, so nothing cached under the new version can hold the old totals
+    user_timezone = current_user.get("timezone", DEFAULT_TIMEZONE)
+    await apply_rollup_change(current_user["_id"], assignment_rollup(assignment, user_timezone), None)
+    await bump_change_version(current_user["_id"], "assignments")
+    
+    await cancel_reminder("assignment", assignment_id)
+    
     # Delete related notifications
     await db.notifications.delete_many({
         "reference_id": assignment_id,
@@ -1878,7 +3541,9 @@ async def create_event(
     }
     
     result = await db.events.insert_one(new_event)
+    await bump_change_version(current_user["_id"], "events")
     created_event = await db.events.find_one({"_id": result.inserted_id})
+    await sync_reminder("event", created_event)
     
     # Convert dates back to user timezone for response
     created_event = process_dates_for_output(created_event, user_timezone)
@@ -1887,16 +3552,22 @@ async def create_event(
 
 @app.get("/events", response_model=List[EventResponse])
 @limiter.limit("60/minute")
+@conditional_list("events")
 async def get_events(
     request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     type: Optional[str] = None,
     subject_id: Optional[str] = None,
     start_after: Optional[datetime] = None,
     start_before: Optional[datetime] = None,
+    fields: Optional[str] = FIELDS_QUERY,
     current_user: dict = Depends(get_current_user)
 ):
+    model, projection = select_fields(EventResponse, fields)
+    
     # Get user timezone
     user_timezone = current_user.get("timezone", DEFAULT_TIMEZONE)
     
@@ -1928,25 +3599,28 @@ async def get_events(
         query["start_time"] = date_query
     
     # Get events with filters
-    events = await db.events.find(query).sort("start_time", 1).skip(skip).limit(limit).to_list(limit)
+    events = await find_page(db.events, query, "start_time", ASCENDING, response, limit, skip, cursor, projection)
     
     # Convert dates to user timezone for response
-    events = process_dates_for_output(events, user_timezone)
+    events = process_dates_for_output(events, user_timezone, EventResponse)
     
-    return events
+    return list_response(model, events, response)
 
 @app.get("/events/{event_id}", response_model=EventResponse)
 @limiter.limit("60/minute")
 async def get_event(
     request: Request,
+    response: Response,
     event_id: str,
+    fields: Optional[str] = FIELDS_QUERY,
     current_user: dict = Depends(get_current_user)
 ):
+    model, projection = select_fields(EventResponse, fields)
     try:
         event = await db.events.find_one({
             "_id": ObjectId(event_id),
             "user_id": ObjectId(current_user["_id"])
-        })
+        }, projection)
     except InvalidId:
         raise HTTPException(status_code=400, detail="Invalid event ID format")
     
@@ -1957,7 +3631,7 @@ async def get_event(
     user_timezone = current_user.get("timezone", DEFAULT_TIMEZONE)
     event = process_dates_for_output(event, user_timezone)
     
-    return event
+    return document_response(model, event, response)
 
 @app.put("/events/{event_id}", response_model=EventResponse)
 @limiter.limit("30/minute")
@@ -2025,9 +3699,12 @@ async def update_event(
             {"_id": ObjectId(event_id)},
             {"$set": update_data}
         )
+        await bump_change_version(current_user["_id"], "events")
     
     # Return updated event
     updated_event = await db.events.find_one({"_id": ObjectId(event_id)})
+    if "start_time" in update_data:
+        await sync_reminder("event", updated_event)
     
     # Convert dates to user timezone for response
     updated_event = process_dates_for_output(updated_event, user_timezone)
@@ -2055,6 +3732,8 @@ async def delete_event(
     
     # Delete event
     await db.events.delete_one({"_id": ObjectId(event_id)})
+    await bump_change_version(current_user["_id"], "events")
+    await cancel_reminder("event", event_id)
     
     # Delete related notifications
     await db.notifications.delete_many({
@@ -2098,6 +3777,7 @@ async def create_study_session(
     }
     
     result = await db.study_sessions.insert_one(new_study_session)
+    await bump_change_version(current_user["_id"], "study_sessions")
     created_study_session = await db.study_sessions.find_one({"_id": result.inserted_id})
     
     # Convert dates to user timezone for response
@@ -2109,14 +3789,19 @@ async def create_study_session(
 @limiter.limit("60/minute")
 async def get_study_sessions(
     request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     subject_id: Optional[str] = None,
     completed: Optional[bool] = None,
     scheduled_after: Optional[datetime] = None,
     scheduled_before: Optional[datetime] = None,
+    fields: Optional[str] = FIELDS_QUERY,
     current_user: dict = Depends(get_current_user)
 ):
+    model, projection = select_fields(StudySessionResponse, fields)
+    
     # Get user timezone
     user_timezone = current_user.get("timezone", DEFAULT_TIMEZONE)
     
@@ -2146,25 +3831,28 @@ async def get_study_sessions(
         query["scheduled_date"] = date_query
     
     # Get study sessions with filters
-    study_sessions = await db.study_sessions.find(query).sort("scheduled_date", 1).skip(skip).limit(limit).to_list(limit)
+    study_sessions = await find_page(db.study_sessions, query, "scheduled_date", ASCENDING, response, limit, skip, cursor, projection)
     
     # Convert dates to user timezone for response
-    study_sessions = process_dates_for_output(study_sessions, user_timezone)
+    study_sessions = process_dates_for_output(study_sessions, user_timezone, StudySessionResponse)
     
-    return study_sessions
+    return list_response(model, study_sessions, response)
 
 @app.get("/study-sessions/{session_id}", response_model=StudySessionResponse)
 @limiter.limit("60/minute")
 async def get_study_session(
     request: Request,
+    response: Response,
     session_id: str,
+    fields: Optional[str] = FIELDS_QUERY,
     current_user: dict = Depends(get_current_user)
 ):
+    model, projection = select_fields(StudySessionResponse, fields)
     try:
         study_session = await db.study_sessions.find_one({
             "_id": ObjectId(session_id),
             "user_id": ObjectId(current_user["_id"])
-        })
+        }, projection)
     except InvalidId:
         raise HTTPException(status_code=400, detail="Invalid study session ID format")
     
@@ -2175,7 +3863,7 @@ async def get_study_session(
     user_timezone = current_user.get("timezone", DEFAULT_TIMEZONE)
     study_session = process_dates_for_output(study_session, user_timezone)
     
-    return study_session
+    return document_response(model, study_session, response)
 
 @app.put("/study-sessions/{session_id}", response_model=StudySessionResponse)
 @limiter.limit("30/minute")
@@ -2236,6 +3924,15 @@ async def update_study_session(
     # Return updated study session
     updated_session = await db.study_sessions.find_one({"_id": ObjectId(session_id)})
     
+    # Rollups first, so nothing cached under the new version can hold the old totals
+    await apply_rollup_change(
+        current_user["_id"],
+        session_rollup(study_session, user_timezone),
+        session_rollup(updated_session, user_timezone)
+    )
+    if update_data:
+        await bump_change_version(current_user["_id"], "study_sessions")
+    
     # Convert dates to user timezone for response
     updated_session = process_dates_for_output(updated_session, user_timezone)
     
@@ -2262,6 +3959,11 @@ async def delete_study_session(
     
     # Delete study session
     await db.study_sessions.delete_one({"_id": ObjectId(session_id)})
+    
+    # Rollups first, so nothing cached under the new version can hold the old totals
+    user_timezone = current_user.get("timezone", DEFAULT_TIMEZONE)
+    await apply_rollup_change(current_user["_id"], session_rollup(study_session, user_timezone), None)
+    await bump_change_version(current_user["_id"], "study_sessions")
     return None
 
 @app.post("/materials", response_model=MaterialResponse, status_code=201)
@@ -2274,6 +3976,14 @@ async def upload_material(
     file: UploadFile = File(...),
     current_user: dict = Depends(get_current_user)
 ):
+    # Get file extension and validate before reading any content
+    file_ext = os.path.splitext(file.filename)[1].lower()
+    if file_ext not in ALLOWED_EXTENSIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"File type not allowed. Allowed types: {', '.join(ALLOWED_EXTENSIONS)}"
+        )
+    
     # Validate subject_id
     try:
         subject = await db.subjects.find_one({
@@ -2293,28 +4003,6 @@ async def upload_material(
             detail=f"You've reached the maximum limit of {MAX_FILES_PER_USER} files. Please delete some files before uploading more."
         )
     
-    # Read file content
-    file_content = await file.read()
-    file_size = len(file_content)
-    
-    # Validate file size
-    if file_size > MAX_FILE_SIZE:
-        raise HTTPException(
-            status_code=400,
-            detail=f"File size exceeds the maximum limit of 5MB"
-        )
-    
-    # Get file extension and validate
-    file_ext = os.path.splitext(file.filename)[1].lower()
-    if file_ext not in ALLOWED_EXTENSIONS:
-        raise HTTPException(
-            status_code=400,
-            detail=f"File type not allowed. Allowed types: {', '.join(ALLOWED_EXTENSIONS)}"
-        )
-    
-    # Generate unique filename
-    unique_filename = f"{uuid.uuid4()}{file_ext}"
-    
     # Determine file type category
     file_type = "document"
     if file_ext in [".jpg", ".jpeg", ".png", ".gif"]:
@@ -2324,16 +4012,28 @@ async def upload_material(
     elif file_ext in [".pdf"]:
         file_type = "pdf"
     
-    # Store file in GridFS
-    file_id = await fs.upload_from_stream(
-        unique_filename,
-        io.BytesIO(file_content),
-        metadata={
-            "content_type": mimetypes.guess_type(file.filename)[0] or "application/octet-stream",
-            "user_id": str(current_user["_id"]),
-            "original_filename": file.filename
-        }
-    )
+    # Hash the upload chunk by chunk, enforcing the size limit as we go
+    sha256 = hashlib.sha256()
+    file_size = 0
+    while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+        file_size += len(chunk)
+        if file_size > MAX_FILE_SIZE:
+            raise HTTPException(
+                status_code=400,
+                detail=f"File size exceeds the maximum limit of 5MB"
+            )
+        sha256.update(chunk)
+    content_hash = sha256.hexdigest()
+    
+    # Content that is already stored only gains a reference, new content is streamed into storage
+    blob = await acquire_blob(content_hash)
+    if blob is None:
+        await file.seek(0)
+        key = await blob_storage.save(read_upload(file), f"{content_hash}{file_ext}")
+        blob = await register_blob(content_hash, key, file_size, blob_storage.name)
+        if blob["key"] != key:
+            # An identical upload registered first, use its copy
+            await blob_storage.delete(key)
     
     # Create material record
     new_material = {
@@ -2341,14 +4041,20 @@ async def upload_material(
         "description": description,
         "file_type": file_type,
         "file_size": file_size,
-        "file_path": str(file_id),  # Store GridFS file ID as the path
+        "file_path": blob["key"],  # Storage key of the file
+        "content_hash": content_hash,
         "original_filename": file.filename,  # Store original filename
         "subject_id": ObjectId(subject_id),
         "user_id": ObjectId(current_user["_id"]),
         "uploaded_at": datetime.now(timezone.utc)
     }
     
-    result = await db.materials.insert_one(new_material)
+    try:
+        result = await db.materials.insert_one(new_material)
+    except BaseException:
+        await release_blob(content_hash)
+        raise
+    await bump_change_version(current_user["_id"], "materials")
     created_material = await db.materials.find_one({"_id": result.inserted_id})
     
     # Convert dates to user timezone for response
@@ -2357,6 +4063,350 @@ async def upload_material(
     
     return created_material
 
+# Material blob storage backends. A key is an opaque string chosen by the backend
+# when the file is saved and recorded in the blobs collection next to the backend name.
+class StoredBlob:
+    """An opened blob: its size, modification time and the backend's handle for sending it"""
+    def __init__(self, key: str, length: int, modified: datetime, handle: Any):
+        self.key = key
+        self.length = length
+        self.modified = modified
+        self.handle = handle
+
+class BlobStorage(ABC):
+    name = ""
+
+    @abstractmethod
+    async def save(self, chunks, filename: str) -> str:
+        """Store the chunks of an async iterator, returns the new key"""
+
+    @abstractmethod
+    async def open(self, key: str) -> StoredBlob:
+        """Size, modification time and handle of a stored blob"""
+
+    @abstractmethod
+    def response(self, blob: StoredBlob, start: int, end: int, **kwargs) -> Response:
+        """Response sending bytes [start, end] of an opened blob"""
+
+    @abstractmethod
+    def read(self, key: str):
+        """Yield the whole content chunk by chunk (an async generator)"""
+
+    @abstractmethod
+    async def delete(self, key: str):
+        """Remove a stored blob"""
+
+class GridFSBlobStorage(BlobStorage):
+    name = "gridfs"
+
+    def __init__(self, bucket: AsyncIOMotorGridFSBucket):
+        self.bucket = bucket
+
+    async def save(self, chunks, filename: str) -> str:
+        grid_in = self.bucket.open_upload_stream(filename, chunk_size_bytes=UPLOAD_CHUNK_SIZE)
+        try:
+            async for chunk in chunks:
+                await grid_in.write(chunk)
+            await grid_in.close()
+        except BaseException:
+            # Removes the chunks written so far
+            await grid_in.abort()
+            raise
+        return str(grid_in._id)
+
+    async def open(self, key: str) -> StoredBlob:
+        grid_out = await self.bucket.open_download_stream(ObjectId(key))
+        return StoredBlob(key, grid_out.length, as_utc(grid_out.upload_date), grid_out)
+
+    def response(self, blob: StoredBlob, start: int, end: int, **kwargs) -> Response:
+        return StreamingResponse(stream_grid_out(blob.handle, start, end + 1), **kwargs)
+
+    async def read(self, key: str):
+        blob = await self.open(key)
+        async for chunk in stream_grid_out(blob.handle, 0, blob.length):
+            yield chunk
+
+    async def delete(self, key: str):
+        await self.bucket.delete(ObjectId(key))
+
+class BlobFileResponse(FileResponse):
+    """FileResponse for a byte range, handed to the server's sendfile when it offers zero-copy send"""
+    def __init__(self, path: str, start: int, end: int, **kwargs):
+        super().__init__(path, **kwargs)
+        self.start = start
+        self.count = end - start + 1
+
+    async def __call__(self, scope, receive, send):
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if self.send_header_only or not self.count:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            if "http.response.zerocopysend" in scope.get("extensions", {}):
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": file.wrapped,
+                    "offset": self.start,
+                    "count": self.count
+                })
+                return
+            await file.seek(self.start)
+            remaining = self.count
+            while remaining > 0:
+                chunk = await file.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                # File shrank underneath us, end the response instead of hanging the client
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+class LocalBlobStorage(BlobStorage):
+    name = "local"
+    KEY_PATTERN = re.compile(r"[0-9a-f]{32}")
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def path(self, key: str) -> str:
+        # Keys come from the database, never let one point outside the root
+        if not self.KEY_PATTERN.fullmatch(key):
+            raise ValueError(f"Invalid local blob key: {key!r}")
+        return os.path.join(self.root, key[:2], key)
+
+    async def save(self, chunks, filename: str) -> str:
+        key = uuid.uuid4().hex
+        path = self.path(key)
+        partial_path = f"{path}.part"
+        await anyio.to_thread.run_sync(partial(os.makedirs, os.path.dirname(path), exist_ok=True))
+        try:
+            async with await anyio.open_file(partial_path, mode="wb") as file:
+                async for chunk in chunks:
+                    await file.write(chunk)
+            # Only complete files ever appear under their key
+            await anyio.to_thread.run_sync(os.replace, partial_path, path)
+        except BaseException:
+            with anyio.CancelScope(shield=True):
+                await anyio.to_thread.run_sync(partial(self._remove, partial_path))
+            raise
+        return key
+
+    async def open(self, key: str) -> StoredBlob:
+        path = self.path(key)
+        stat_result = await anyio.to_thread.run_sync(os.stat, path)
+        modified = datetime.fromtimestamp(stat_result.st_mtime, timezone.utc)
+        return StoredBlob(key, stat_result.st_size, modified, (path, stat_result))
+
+    def response(self, blob: StoredBlob, start: int, end: int, **kwargs) -> Response:
+        path, stat_result = blob.handle
+        return BlobFileResponse(path, start, end, stat_result=stat_result, **kwargs)
+
+    async def read(self, key: str):
+        async with await anyio.open_file(self.path(key), mode="rb") as file:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                yield chunk
+
+    async def delete(self, key: str):
+        await anyio.to_thread.run_sync(self._remove, self.path(key))
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+BLOB_BACKENDS: Dict[str, BlobStorage] = {
+    "gridfs": GridFSBlobStorage(fs),
+    "local": LocalBlobStorage(BLOB_STORAGE_PATH)
+}
+if BLOB_STORAGE not in BLOB_BACKENDS:
+    raise RuntimeError(f"Unknown BLOB_STORAGE {BLOB_STORAGE!r}, expected one of {', '.join(BLOB_BACKENDS)}")
+blob_storage = BLOB_BACKENDS[BLOB_STORAGE]
+
+def storage_for(blob: dict) -> BlobStorage:
+    # Blobs recorded before storage was pluggable have no storage field and live in GridFS
+    return BLOB_BACKENDS[blob.get("storage", "gridfs")]
+
+async def material_blob(material: dict) -> Tuple[BlobStorage, str]:
+    """Backend and key holding a material's file"""
+    if material.get("content_hash"):
+        blob = await db.blobs.find_one({"_id": material["content_hash"]}, {"key": 1, "storage": 1})
+        if blob:
+            return storage_for(blob), blob["key"]
+    # Materials stored before deduplication own a GridFS file
+    return BLOB_BACKENDS["gridfs"], material["file_path"]
+
+async def read_upload(file: UploadFile):
+    while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+        yield chunk
+
+# Content-addressed material blobs, identical uploads share one stored file.
+# A blob is {_id: sha256, key, storage: backend name, size, refcount}.
+async def acquire_blob(content_hash: str) -> Optional[dict]:
+    """Add a reference to stored content, None if the content isn't stored yet"""
+    return await db.blobs.find_one_and_update(
+        {"_id": content_hash},
+        {"$inc": {"refcount": 1}},
+        return_document=ReturnDocument.AFTER
+    )
+
+async def register_blob(content_hash: str, key: str, size: int, storage: str) -> dict:
+    """Record newly stored content with one reference.
+    
+    If an identical upload got there first, that blob gains the reference instead;
+    the caller compares the returned key with its own and deletes its copy.
+    """
+    for attempt in range(2):
+        try:
+            return await db.blobs.find_one_and_update(
+                {"_id": content_hash},
+                {
+                    "$inc": {"refcount": 1},
+                    "$setOnInsert": {
+                        "key": key,
+                        "storage": storage,
+                        "size": size,
+                        "created_at": datetime.now(timezone.utc)
+                    }
+                },
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            # Concurrent upsert of the same content, the retry takes the update path
+            if attempt:
+                raise
+
+async def release_blob(content_hash: str):
+    """Drop a reference, deleting the stored file with the last one"""
+    blob = await db.blobs.find_one_and_update(
+        {"_id": content_hash},
+        {"$inc": {"refcount": -1}},
+        return_document=ReturnDocument.AFTER
+    )
+    if not blob or blob["refcount"] > 0:
+        return
+    # Only delete if no upload took a new reference in the meantime
+    result = await db.blobs.delete_one({"_id": content_hash, "refcount": {"$lte": 0}})
+    if result.deleted_count:
+        storage = storage_for(blob)
+        try:
+            await storage.delete(blob["key"])
+        except Exception as e:
+            logger.error(f"Error deleting blob {content_hash} from {storage.name}: {str(e)}")
+
+async def migrate_blobs(target: str) -> Dict[str, int]:
+    """Move stored material files into the target backend.
+    
+    Materials from before deduplication are hashed and registered on the way.
+    Meant to run with uploads paused: a reference taken on a blob while it moves
+    still records the old key in the material's file_path.
+    """
+    destination = BLOB_BACKENDS[target]
+    counts = {"moved": 0, "registered": 0, "failed": 0}
+    # Owners of rewritten materials, file_path is part of the list responses
+    changed_users = set()
+    try:
+        await move_blobs(target, destination, counts, changed_users)
+    finally:
+        await bump_change_versions_many(changed_users, "materials")
+    return counts
+
+async def move_blobs(target: str, destination: BlobStorage, counts: Dict[str, int], changed_users: set):
+    stored_elsewhere = {"storage": {"$ne": target}}
+    if target == "gridfs":
+        stored_elsewhere["storage"]["$exists"] = True
+    async for blob in db.blobs.find(stored_elsewhere):
+        source = storage_for(blob)
+        try:
+            key = await destination.save(source.read(blob["key"]), blob["_id"])
+            result = await db.blobs.update_one(
+                {"_id": blob["_id"], "key": blob["key"]},
+                {"$set": {"key": key, "storage": target}}
+            )
+            if not result.modified_count:
+                # Released while we copied it
+                await destination.delete(key)
+                continue
+            changed_users.update(await db.materials.distinct("user_id", {"content_hash": blob["_id"]}))
+            await db.materials.update_many({"content_hash": blob["_id"]}, {"$set": {"file_path": key}})
+            await source.delete(blob["key"])
+            counts["moved"] += 1
+        except Exception as e:
+            logger.error(f"Error moving blob {blob['_id']} to {target}: {str(e)}")
+            counts["failed"] += 1
+    
+    gridfs = BLOB_BACKENDS["gridfs"]
+    async for material in db.materials.find({"content_hash": {"$exists": False}}, {"file_path": 1, "user_id": 1}):
+        try:
+            sha256 = hashlib.sha256()
+            size = 0
+            async for chunk in gridfs.read(material["file_path"]):
+                sha256.update(chunk)
+                size += len(chunk)
+            content_hash = sha256.hexdigest()
+            
+            blob = await acquire_blob(content_hash)
+            if blob is None:
+                if target == "gridfs":
+                    key = material["file_path"]
+                else:
+                    key = await destination.save(gridfs.read(material["file_path"]), content_hash)
+                blob = await register_blob(content_hash, key, size, target)
+                if blob["key"] != key and key != material["file_path"]:
+                    await destination.delete(key)
+            await db.materials.update_one(
+                {"_id": material["_id"]},
+                {"$set": {"content_hash": content_hash, "file_path": blob["key"]}}
+            )
+            changed_users.add(material["user_id"])
+            if blob["key"] != material["file_path"]:
+                await gridfs.delete(material["file_path"])
+            counts["registered"] += 1
+        except Exception as e:
+            logger.error(f"Error migrating material {material['_id']} to {target}: {str(e)}")
+            counts["failed"] += 1
+
+# Material downloads stream from their backend, one chunk in memory at a time
+def parse_byte_range(range_header: str, length: int) -> Optional[Tuple[int, int]]:
+    """Inclusive (start, end) of a single bytes range, None to serve the whole file"""
+    unit, _, ranges = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in ranges:
+        # Other units and multipart ranges are answered with the full file
+        return None
+    first, _, last = ranges.strip().partition("-")
+    try:
+        if first:
+            start = int(first)
+            end = min(int(last), length - 1) if last else length - 1
+        elif last:
+            start, end = max(length - int(last), 0), length - 1
+        else:
+            return None
+    except ValueError:
+        return None
+    if start < 0 or start > end:
+        raise HTTPException(
+            status_code=416,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{length}"}
+        )
+    return start, end
+
+async def stream_grid_out(grid_out, start: int, end: int):
+    """Yield bytes [start, end) of a GridFS file chunk by chunk"""
+    grid_out.seek(start)
+    remaining = end - start
+    while remaining > 0:
+        chunk = await grid_out.readchunk()
+        if not chunk:
+            break
+        chunk = chunk[:remaining]
+        remaining -= len(chunk)
+        yield chunk
+
 @app.get("/materials/download/{material_id}")
 @limiter.limit("20/minute")
 async def download_material(
@@ -2365,20 +4415,18 @@ async def download_material(
     token: Optional[str] = Query(None),
     current_user: Optional[dict] = None
 ):
-    # Allow authentication via token parameter or regular auth
-    if token and not current_user:
-        try:
-            payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-            user_id = payload.get("user_id")
-            if user_id:
-                # Use cache if available
-                current_user = await get_cached_user(user_id)
-        except:
-            pass
-    
-    # If still no current_user, use the regular auth dependency
+    # Allow authentication via token parameter (plain download links) or the Authorization header,
+    # both go through the same claims and revocation checks as every other endpoint
     if not current_user:
-        current_user = await get_current_user(Depends(oauth2_scheme))
+        if not token:
+            scheme, _, token = request.headers.get("authorization", "").partition(" ")
+            if scheme.lower() != "bearer" or not token:
+                raise HTTPException(
+                    status_code=401,
+                    detail="Not authenticated",
+                    headers={"WWW-Authenticate": "Bearer"}
+                )
+        current_user = await get_current_user(token)
     
     try:
         # Check if material exists and belongs to user
@@ -2392,62 +4440,75 @@ async def download_material(
     if not material:
         raise HTTPException(status_code=404, detail="Material not found")
     
-    # Get file ID from file_path
-    try:
-        file_id = ObjectId(material["file_path"])
-    except InvalidId:
-        raise HTTPException(status_code=500, detail="Invalid file reference")
+    # Stored files never change, so the content hash (or file id) is a strong validator
+    etag = f'"{material.get("content_hash") or material["file_path"]}"'
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": DOWNLOAD_CACHE_CONTROL})
     
+    storage, key = await material_blob(material)
     try:
-        # Create a GridOut object to get the file
-        grid_out = await fs.open_download_stream(file_id)
-        
-        # Get file data
-        chunks = []
-        async for chunk in grid_out:
-            chunks.append(chunk)
-        
-        # Combine chunks
-        file_data = b''.join(chunks)
-        
-        # Get content type from metadata or guess from filename
-        content_type = grid_out.metadata.get("content_type", "application/octet-stream")
-        
-        # Get original filename or use material name with extension
-        original_filename = material.get("original_filename") or f"{material['name']}"
-        if not os.path.splitext(original_filename)[1]:
-            # Add extension if missing
-            if material["file_type"] == "pdf":
-                original_filename += ".pdf"
-            elif material["file_type"] == "document":
-                original_filename += ".docx"
-            elif material["file_type"] == "spreadsheet":
-                original_filename += ".xlsx"
-            elif material["file_type"] == "image":
-                original_filename += ".jpg"
-        
-        # Return file as streaming response
-        return StreamingResponse(
-            io.BytesIO(file_data),
-            media_type=content_type,
-            headers={
-                "Content-Disposition": f"attachment; filename=\"{original_filename}\""
-            }
-        )
+        stored = await storage.open(key)
     except Exception as e:
         logger.error(f"Error downloading file: {str(e)}")
         raise HTTPException(status_code=500, detail="Error retrieving file")
+    
+    # Get original filename or use material name with extension
+    original_filename = material.get("original_filename") or f"{material['name']}"
+    if not os.path.splitext(original_filename)[1]:
+        # Add extension if missing
+        if material["file_type"] == "pdf":
+            original_filename += ".pdf"
+        elif material["file_type"] == "document":
+            original_filename += ".docx"
+        elif material["file_type"] == "spreadsheet":
+            original_filename += ".xlsx"
+        elif material["file_type"] == "image":
+            original_filename += ".jpg"
+    
+    content_type = mimetypes.guess_type(original_filename)[0] or "application/octet-stream"
+    
+    length = stored.length
+    last_modified = format_datetime(stored.modified, usegmt=True)
+    headers = {
+        "Content-Disposition": f"attachment; filename=\"{original_filename}\"",
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
+        "Last-Modified": last_modified,
+        "Cache-Control": DOWNLOAD_CACHE_CONTROL
+    }
+    
+    # A Range is only honoured while If-Range (if sent) still matches the file
+    byte_range = None
+    if_range = request.headers.get("if-range")
+    if request.headers.get("range") and (not if_range or if_range in (etag, last_modified)):
+        byte_range = parse_byte_range(request.headers["range"], length)
+    
+    status_code = 200
+    start, end = 0, length - 1
+    if byte_range:
+        start, end = byte_range
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{length}"
+    headers["Content-Length"] = str(end - start + 1 if length else 0)
+    
+    return storage.response(stored, start, end, status_code=status_code, media_type=content_type, headers=headers)
 
 @app.get("/materials", response_model=List[MaterialResponse])
 @limiter.limit("60/minute")
+@conditional_list("materials")
 async def get_materials(
     request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     subject_id: Optional[str] = None,
     file_type: Optional[str] = None,
+    fields: Optional[str] = FIELDS_QUERY,
     current_user: dict = Depends(get_current_user)
 ):
+    model, projection = select_fields(MaterialResponse, fields)
+    
     # Build filter query
     query = {"user_id": ObjectId(current_user["_id"])}
     
@@ -2463,26 +4524,29 @@ async def get_materials(
         query["file_type"] = file_type
     
     # Get materials with filters
-    materials = await db.materials.find(query).sort("uploaded_at", -1).skip(skip).limit(limit).to_list(limit)
+    materials = await find_page(db.materials, query, "uploaded_at", DESCENDING, response, limit, skip, cursor, projection)
     
     # Convert dates to user timezone for response
     user_timezone = current_user.get("timezone", DEFAULT_TIMEZONE)
-    materials = process_dates_for_output(materials, user_timezone)
+    materials = process_dates_for_output(materials, user_timezone, MaterialResponse)
     
-    return materials
+    return list_response(model, materials, response)
 
 @app.get("/materials/{material_id}", response_model=MaterialResponse)
 @limiter.limit("60/minute")
 async def get_material(
     request: Request,
+    response: Response,
     material_id: str,
+    fields: Optional[str] = FIELDS_QUERY,
     current_user: dict = Depends(get_current_user)
 ):
+    model, projection = select_fields(MaterialResponse, fields)
     try:
         material = await db.materials.find_one({
             "_id": ObjectId(material_id),
             "user_id": ObjectId(current_user["_id"])
-        })
+        }, projection)
     except InvalidId:
         raise HTTPException(status_code=400, detail="Invalid material ID format")
     
@@ -2493,7 +4557,7 @@ async def get_material(
     user_timezone = current_user.get("timezone", DEFAULT_TIMEZONE)
     material = process_dates_for_output(material, user_timezone)
     
-    return material
+    return document_response(model, material, response)
 
 @app.put("/materials/{material_id}", response_model=MaterialResponse)
 @limiter.limit("30/minute")
@@ -2535,6 +4599,7 @@ async def update_material(
             {"_id": ObjectId(material_id)},
             {"$set": update_data}
         )
+        await bump_change_version(current_user["_id"], "materials")
     
     # Return updated material
     updated_material = await db.materials.find_one({"_id": ObjectId(material_id)})
@@ -2564,15 +4629,20 @@ async def delete_material(
     if not material:
         raise HTTPException(status_code=404, detail="Material not found")
     
-    # Delete the file from GridFS
-    try:
-        file_id = ObjectId(material["file_path"])
-        await fs.delete(file_id)
-    except Exception as e:
-        logger.error(f"Error deleting file from GridFS: {str(e)}")
+    # Delete material record, only the request that removed it releases the file
+    result = await db.materials.delete_one({"_id": ObjectId(material_id)})
+    if not result.deleted_count:
+        return None
+    await bump_change_version(current_user["_id"], "materials")
     
-    # Delete material record
-    await db.materials.delete_one({"_id": ObjectId(material_id)})
+    # Release the shared blob, materials stored before deduplication own their file
+    if material.get("content_hash"):
+        await release_blob(material["content_hash"])
+    else:
+        try:
+            await BLOB_BACKENDS["gridfs"].delete(material["file_path"])
+        except Exception as e:
+            logger.error(f"Error deleting file from GridFS: {str(e)}")
     
     return None
     
@@ -2625,6 +4695,7 @@ async def create_goal(
     }
     
     result = await db.goals.insert_one(new_goal)
+    await bump_change_version(current_user["_id"], "goals")
     created_goal = await db.goals.find_one({"_id": result.inserted_id})
     
     # Convert dates back to user timezone for response
@@ -2634,14 +4705,20 @@ async def create_goal(
 
 @app.get("/goals", response_model=List[GoalResponse])
 @limiter.limit("60/minute")
+@conditional_list("goals")
 async def get_goals(
     request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     subject_id: Optional[str] = None,
     completed: Optional[bool] = None,
+    fields: Optional[str] = FIELDS_QUERY,
     current_user: dict = Depends(get_current_user)
 ):
+    model, projection = select_fields(GoalResponse, fields)
+    
     # Build filter query
     query = {"user_id": ObjectId(current_user["_id"])}
     
@@ -2655,26 +4732,29 @@ async def get_goals(
         query["completed"] = completed
     
     # Get goals with filters
-    goals = await db.goals.find(query).sort("target_date", 1).skip(skip).limit(limit).to_list(limit)
+    goals = await find_page(db.goals, query, "target_date", ASCENDING, response, limit, skip, cursor, projection)
     
     # Convert dates to user timezone for response
     user_timezone = current_user.get("timezone", DEFAULT_TIMEZONE)
-    goals = process_dates_for_output(goals, user_timezone)
+    goals = process_dates_for_output(goals, user_timezone, GoalResponse)
     
-    return goals
+    return list_response(model, goals, response)
 
 @app.get("/goals/{goal_id}", response_model=GoalResponse)
 @limiter.limit("60/minute")
 async def get_goal(
     request: Request,
+    response: Response,
     goal_id: str,
+    fields: Optional[str] = FIELDS_QUERY,
     current_user: dict = Depends(get_current_user)
 ):
+    model, projection = select_fields(GoalResponse, fields)
     try:
         goal = await db.goals.find_one({
             "_id": ObjectId(goal_id),
             "user_id": ObjectId(current_user["_id"])
-        })
+        }, projection)
     except InvalidId:
         raise HTTPException(status_code=400, detail="Invalid goal ID format")
     
@@ -2685,7 +4765,7 @@ async def get_goal(
     user_timezone = current_user.get("timezone", DEFAULT_TIMEZONE)
     goal = process_dates_for_output(goal, user_timezone)
     
-    return goal
+    return document_response(model, goal, response)
 
 @app.put("/goals/{goal_id}", response_model=GoalResponse)
 @limiter.limit("30/minute")
@@ -2748,6 +4828,7 @@ async def update_goal(
             {"_id": ObjectId(goal_id)},
             {"$set": update_data}
         )
+        await bump_change_version(current_user["_id"], "goals")
     
     # Return updated goal
     updated_goal = await db.goals.find_one({"_id": ObjectId(goal_id)})
@@ -2778,6 +4859,7 @@ async def delete_goal(
     
     # Delete goal
     await db.goals.delete_one({"_id": ObjectId(goal_id)})
+    await bump_change_version(current_user["_id"], "goals")
     return None
 
 # Note endpoints
@@ -2807,6 +4889,7 @@ async def create_note(
     }
     
     result = await db.notes.insert_one(new_note)
+    await bump_change_version(current_user["_id"], "notes")
     created_note = await db.notes.find_one({"_id": result.inserted_id})
     
     # Convert dates to user timezone for response
@@ -2817,15 +4900,21 @@ async def create_note(
 
 @app.get("/notes", response_model=List[NoteResponse])
 @limiter.limit("60/minute")
+@conditional_list("notes")
 async def get_notes(
     request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     subject_id: Optional[str] = None,
     tag: Optional[str] = None,
     search: Optional[str] = None,
+    fields: Optional[str] = FIELDS_QUERY,
     current_user: dict = Depends(get_current_user)
 ):
+    model, projection = select_fields(NoteResponse, fields)
+    
     # Build filter query
     query = {"user_id": ObjectId(current_user["_id"])}
     
@@ -2846,26 +4935,29 @@ async def get_notes(
         ]
     
     # Get notes with filters
-    notes = await db.notes.find(query).sort("created_at", -1).skip(skip).limit(limit).to_list(limit)
+    notes = await find_page(db.notes, query, "created_at", DESCENDING, response, limit, skip, cursor, projection)
     
     # Convert dates to user timezone for response
     user_timezone = current_user.get("timezone", DEFAULT_TIMEZONE)
-    notes = process_dates_for_output(notes, user_timezone)
+    notes = process_dates_for_output(notes, user_timezone, NoteResponse)
     
-    return notes
+    return list_response(model, notes, response)
 
 @app.get("/notes/{note_id}", response_model=NoteResponse)
 @limiter.limit("60/minute")
 async def get_note(
     request: Request,
+    response: Response,
     note_id: str,
+    fields: Optional[str] = FIELDS_QUERY,
     current_user: dict = Depends(get_current_user)
 ):
+    model, projection = select_fields(NoteResponse, fields)
     try:
         note = await db.notes.find_one({
             "_id": ObjectId(note_id),
             "user_id": ObjectId(current_user["_id"])
-        })
+        }, projection)
     except InvalidId:
         raise HTTPException(status_code=400, detail="Invalid note ID format")
     
@@ -2876,7 +4968,7 @@ async def get_note(
     user_timezone = current_user.get("timezone", DEFAULT_TIMEZONE)
     note = process_dates_for_output(note, user_timezone)
     
-    return note
+    return document_response(model, note, response)
 
 @app.put("/notes/{note_id}", response_model=NoteResponse)
 @limiter.limit("30/minute")
@@ -2918,6 +5010,7 @@ async def update_note(
             {"_id": ObjectId(note_id)},
             {"$set": update_data}
         )
+        await bump_change_version(current_user["_id"], "notes")
     
     # Return updated note
     updated_note = await db.notes.find_one({"_id": ObjectId(note_id)})
@@ -2949,18 +5042,138 @@ async def delete_note(
     
     # Delete note
     await db.notes.delete_one({"_id": ObjectId(note_id)})
+    await bump_change_version(current_user["_id"], "notes")
     return None
 
+# Study rollups: per (user, local day, subject) totals maintained on every write
+def rollup_day(moment: datetime, user_timezone: str) -> str:
+    return convert_to_user_timezone(moment, user_timezone).strftime("%Y-%m-%d")
+
+def session_rollup(session: Optional[dict], user_timezone: str) -> Optional[dict]:
+    """What a study session contributes to the rollups, None if nothing"""
+    if not session or not session.get("completed") or not session.get("completed_at"):
+        return None
+    return {
+        "day": rollup_day(session["completed_at"], user_timezone),
+        "subject_id": session.get("subject_id"),
+        "minutes": session.get("actual_duration") or 0,
+        "sessions": 1
+    }
+
+def assignment_rollup(assignment: Optional[dict], user_timezone: str) -> Optional[dict]:
+    """What an assignment contributes to the rollups, None if nothing"""
+    if not assignment or assignment.get("status") != "completed":
+        return None
+    # Same fallback as rebuild_study_rollups for assignments completed before completed_at was recorded
+    completed_at = assignment.get("completed_at") or assignment.get("updated_at") or assignment.get("created_at")
+    if not completed_at:
+        return None
+    return {
+        "day": rollup_day(completed_at, user_timezone),
+        "subject_id": assignment.get("subject_id"),
+        "assignments_completed": 1
+    }
+
+async def apply_rollup_change(user_id, old: Optional[dict], new: Optional[dict]):
+    """Move a document's contribution from its old rollup bucket to its new one"""
+    if old == new:
+        return
+    operations = []
+    for contribution, sign in ((old, -1), (new, 1)):
+        if contribution is None:
+            continue
+        increments = {
+            field: sign * contribution.get(field, 0)
+            for field in ("minutes", "sessions", "assignments_completed")
+        }
+        operations.append(UpdateOne(
+            {"user_id": ObjectId(user_id), "day": contribution["day"], "subject_id": contribution["subject_id"]},
+            {"$inc": increments},
+            upsert=True
+        ))
+    await db.study_rollups.bulk_write(operations, ordered=True)
+
+async def move_subject_rollups(user_id, subject_id):
+    """Fold a deleted subject's rollups into the no-subject bucket, like the cascade does"""
+    rollups = await db.study_rollups.find({"user_id": ObjectId(user_id), "subject_id": ObjectId(subject_id)}).to_list(None)
+    if not rollups:
+        return
+    await db.study_rollups.bulk_write([
+        UpdateOne(
+            {"user_id": ObjectId(user_id), "day": rollup["day"], "subject_id": None},
+            {"$inc": {field: rollup.get(field, 0) for field in ("minutes", "sessions", "assignments_completed")}},
+            upsert=True
+        )
+        for rollup in rollups
+    ], ordered=False)
+    await db.study_rollups.delete_many({"_id": {"$in": [rollup["_id"] for rollup in rollups]}})
+
+async def rebuild_study_rollups(user_id: Optional[str] = None) -> int:
+    """Recompute rollups from raw sessions and assignments, for one user or everyone"""
+    query = {"_id": ObjectId(user_id)} if user_id else {}
+    rebuilt = 0
+    async for user in db.users.find(query, {"timezone": 1}):
+        user_timezone = user.get("timezone", DEFAULT_TIMEZONE)
+        
+        def local_day(field):
+            return {"$dateToString": {"format": "%Y-%m-%d", "date": field, "timezone": user_timezone}}
+        
+        sessions, assignments = await asyncio.gather(
+            db.study_sessions.aggregate([
+                {"$match": {"user_id": user["_id"], "completed": True, "completed_at": {"$ne": None}}},
+                {"$group": {
+                    "_id": {"day": local_day("$completed_at"), "subject_id": "$subject_id"},
+                    "minutes": {"$sum": {"$ifNull": ["$actual_duration", 0]}},
+                    "sessions": {"$sum": 1}
+                }}
+            ]).to_list(None),
+            db.assignments.aggregate([
+                {"$match": {"user_id": user["_id"], "status": "completed"}},
+                # Assignments completed before completed_at was recorded fall back to their last update
+                {"$group": {
+                    "_id": {
+                        "day": local_day({"$ifNull": ["$completed_at", {"$ifNull": ["$updated_at", "$created_at"]}]}),
+                        "subject_id": "$subject_id"
+                    },
+                    "assignments_completed": {"$sum": 1}
+                }}
+            ]).to_list(None)
+        )
+        
+        buckets = {}
+        for group in sessions + assignments:
+            key = (group["_id"]["day"], group["_id"].get("subject_id"))
+            bucket = buckets.setdefault(key, {"minutes": 0, "sessions": 0, "assignments_completed": 0})
+            for field in bucket:
+                bucket[field] += group.get(field, 0)
+        
+        await db.study_rollups.delete_many({"user_id": user["_id"]})
+        if buckets:
+            await db.study_rollups.insert_many([
+                {"user_id": user["_id"], "day": day, "subject_id": subject_id, **totals}
+                for (day, subject_id), totals in buckets.items()
+            ])
+        rebuilt += 1
+    return rebuilt
+
 # Statistics endpoints
 @app.get("/statistics", response_model=StatisticsResponse)
 @limiter.limit("60/minute")
-@cache(expire=60)  # Cache for 1 minute
+@cache(expire=15 * 60, namespace="statistics", key_builder=user_cache_key_builder)  # Invalidated on write, expires for "today"
+@coalesce(namespace="statistics")
 async def get_statistics(
     request: Request,
+    response: Response,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
+    fields: Optional[str] = FIELDS_QUERY,
     current_user: dict = Depends(get_current_user)
 ):
+    model, _ = select_fields(StatisticsResponse, fields)
+    statistics = await compute_statistics(current_user, start_date, end_date)
+    return document_response(model, statistics, response)
+
+async def compute_statistics(current_user: dict, start_date: Optional[datetime] = None, end_date: Optional[datetime] = None) -> dict:
     # Get user timezone
     user_timezone = current_user.get("timezone", DEFAULT_TIMEZONE)
     
@@ -2977,133 +5190,120 @@ async def get_statistics(
     
     user_id = ObjectId(current_user["_id"])
     
-    # Assignment statistics - use projection to fetch only needed fields
-    total_assignments = await db.assignments.count_documents({
-        "user_id": user_id,
-        "created_at": {"$gte": start_date_utc, "$lte": end_date_utc}
-    })
+    # Local day boundaries for the last 7 days, today included
+    today_user_tz = convert_to_user_timezone(now, user_timezone).date()
+    first_day = today_user_tz - timedelta(days=6)
+    days = [first_day + timedelta(days=i) for i in range(7)]
+    first_day_key = first_day.strftime("%Y-%m-%d")
+    today_key = today_user_tz.strftime("%Y-%m-%d")
+    
+    # Study time comes from the daily rollups, keyed by local day
+    start_day_key = rollup_day(start_date_utc, user_timezone)
+    end_day_key = rollup_day(end_date_utc, user_timezone)
+    in_day_range = {"day": {"$gte": start_day_key, "$lte": end_day_key}}
+    
+    in_range = {"$gte": start_date_utc, "$lte": end_date_utc}
+    completed_flag = {"$cond": [{"$eq": ["$status", "completed"]}, 1, 0]}
+    
+    assignment_pipeline = [
+        {"$match": {"user_id": user_id, "created_at": in_range}},
+        {"$facet": {
+            "totals": [
+                {"$group": {"_id": None, "total": {"$sum": 1}, "completed": {"$sum": completed_flag}}}
+            ],
+            "by_subject": [
+                {"$group": {"_id": "$subject_id", "total": {"$sum": 1}, "completed": {"$sum": completed_flag}}}
+            ]
+        }}
+    ]
     
-    completed_assignments = await db.assignments.count_documents({
-        "user_id": user_id,
-        "status": "completed",
-        "created_at": {"$gte": start_date_utc, "$lte": end_date_utc}
-    })
+    rollup_pipeline = [
+        {"$match": {
+            "user_id": user_id,
+            "day": {"$gte": min(start_day_key, first_day_key), "$lte": max(end_day_key, today_key)}
+        }},
+        {"$facet": {
+            "totals": [
+                {"$match": in_day_range},
+                {"$group": {"_id": None, "minutes": {"$sum": "$minutes"}, "sessions": {"$sum": "$sessions"}}}
+            ],
+            "by_subject": [
+                {"$match": in_day_range},
+                {"$group": {"_id": "$subject_id", "minutes": {"$sum": "$minutes"}}}
+            ],
+            "by_day": [
+                {"$match": {"day": {"$gte": first_day_key, "$lte": today_key}}},
+                {"$group": {"_id": "$day", "minutes": {"$sum": "$minutes"}}}
+            ]
+        }}
+    ]
     
-    pending_assignments = total_assignments - completed_assignments
+    goal_pipeline = [
+        {"$match": {"user_id": user_id, "created_at": in_range}},
+        {"$group": {
+            "_id": None,
+            "total": {"$sum": 1},
+            "completed": {"$sum": {"$cond": [{"$eq": ["$completed", True]}, 1, 0]}}
+        }}
+    ]
     
-    # Upcoming events
-    upcoming_events = await db.events.count_documents({
-        "user_id": user_id,
-        "start_time": {"$gte": now}
-    })
+    # All collections are queried concurrently, one round trip each
+    assignment_stats, study_stats, goal_stats, upcoming_events, subjects = await asyncio.gather(
+        db.assignments.aggregate(assignment_pipeline).to_list(1),
+        db.study_rollups.aggregate(rollup_pipeline).to_list(1),
+        db.goals.aggregate(goal_pipeline).to_list(1),
+        db.events.count_documents({"user_id": user_id, "start_time": {"$gte": now}}),
+        db.subjects.find({"user_id": user_id}, {"name": 1, "color": 1}).to_list(None)
+    )
+    assignment_stats = assignment_stats[0]
+    study_stats = study_stats[0]
     
-    # Study hours - use projection to fetch only needed fields
-    study_sessions = await db.study_sessions.find({
-        "user_id": user_id,
-        "completed": True,
-        "completed_at": {"$gte": start_date_utc, "$lte": end_date_utc}
-    }, {
-        "actual_duration": 1
-    }).to_list(1000)
+    # Assignment statistics
+    assignment_totals = assignment_stats["totals"][0] if assignment_stats["totals"] else {"total": 0, "completed": 0}
+    total_assignments = assignment_totals["total"]
+    completed_assignments = assignment_totals["completed"]
+    pending_assignments = total_assignments - completed_assignments
     
-    study_hours = sum(session.get("actual_duration", 0) for session in study_sessions) / 60.0
+    # Study hours and average session duration
+    study_totals = study_stats["totals"][0] if study_stats["totals"] else {"minutes": 0, "sessions": 0}
+    study_hours = study_totals["minutes"] / 60.0
+    avg_session_duration = (study_totals["minutes"] / study_totals["sessions"]) if study_totals["sessions"] else 0
     
     # Daily study data for last 7 days
-    daily_study_data = []
-    today_utc = now
-    
-    for i in range(7):
-        day_date = today_utc - timedelta(days=6-i)
-        # Convert to user timezone for day boundaries
-        day_date_user_tz = convert_to_user_timezone(day_date, user_timezone)
-        day_start_user_tz = datetime(day_date_user_tz.year, day_date_user_tz.month, day_date_user_tz.day, 0, 0, 0)
-        day_end_user_tz = datetime(day_date_user_tz.year, day_date_user_tz.month, day_date_user_tz.day, 23, 59, 59)
-        
-        # Convert back to UTC for query
-        day_start_utc = convert_to_utc(day_start_user_tz, user_timezone)
-        day_end_utc = convert_to_utc(day_end_user_tz, user_timezone)
-        
-        day_sessions = await db.study_sessions.find({
-            "user_id": user_id,
-            "completed": True,
-            "completed_at": {"$gte": day_start_utc, "$lte": day_end_utc}
-        }, {
-            "actual_duration": 1
-        }).to_list(100)
-        
-        day_minutes = sum(session.get("actual_duration", 0) for session in day_sessions)
-        
-        daily_study_data.append({
-            "date": day_date_user_tz.strftime("%a"),
-            "hours": day_minutes / 60.0
-        })
-    
-    # Average session duration
-    if study_sessions:
-        avg_session_duration = sum(session.get("actual_duration", 0) for session in study_sessions) / len(study_sessions)
-    else:
-        avg_session_duration = 0
+    minutes_by_day = {bucket["_id"]: bucket["minutes"] for bucket in study_stats["by_day"]}
+    daily_study_data = [
+        {"date": day.strftime("%a"), "hours": minutes_by_day.get(day.strftime("%Y-%m-%d"), 0) / 60.0}
+        for day in days
+    ]
     
-    # Subject statistics - use projection to fetch only needed fields
-    subjects = await db.subjects.find({"user_id": user_id}, {
-        "name": 1, "color": 1
-    }).to_list(100)
+    # Subject statistics
+    assignments_by_subject = {bucket["_id"]: bucket for bucket in assignment_stats["by_subject"]}
+    minutes_by_subject = {bucket["_id"]: bucket["minutes"] for bucket in study_stats["by_subject"]}
     subject_stats = []
     
     for subject in subjects:
         subject_id = subject["_id"]
-        
-        # Assignments for this subject
-        subject_assignments = await db.assignments.count_documents({
-            "user_id": user_id,
-            "subject_id": subject_id,
-            "created_at": {"$gte": start_date_utc, "$lte": end_date_utc}
-        })
-        
-        completed_subject_assignments = await db.assignments.count_documents({
-            "user_id": user_id,
-            "subject_id": subject_id,
-            "status": "completed",
-            "created_at": {"$gte": start_date_utc, "$lte": end_date_utc}
-        })
-        
-        # Study time for this subject
-        subject_sessions = await db.study_sessions.find({
-            "user_id": user_id,
-            "subject_id": subject_id,
-            "completed": True,
-            "completed_at": {"$gte": start_date_utc, "$lte": end_date_utc}
-        }, {
-            "actual_duration": 1
-        }).to_list(1000)
-        
-        subject_study_hours = sum(session.get("actual_duration", 0) for session in subject_sessions) / 60.0
+        subject_assignments = assignments_by_subject.get(subject_id, {"total": 0, "completed": 0})
         
         # Completion percentage
         completion_percentage = 0
-        if subject_assignments > 0:
-            completion_percentage = (completed_subject_assignments / subject_assignments) * 100
+        if subject_assignments["total"] > 0:
+            completion_percentage = (subject_assignments["completed"] / subject_assignments["total"]) * 100
         
         subject_stats.append({
             "subject_id": str(subject_id),
             "subject_name": subject["name"],
             "color": subject["color"],
-            "total_assignments": subject_assignments,
-            "completed_assignments": completed_subject_assignments,
-            "study_hours": subject_study_hours,
+            "total_assignments": subject_assignments["total"],
+            "completed_assignments": subject_assignments["completed"],
+            "study_hours": minutes_by_subject.get(subject_id, 0) / 60.0,
             "completion_percentage": completion_percentage
         })
     
     # Goal statistics
-    goals = await db.goals.find({
-        "user_id": user_id,
-        "created_at": {"$gte": start_date_utc, "$lte": end_date_utc}
-    }, {
-        "completed": 1
-    }).to_list(100)
-    
-    total_goals = len(goals)
-    completed_goals = sum(1 for goal in goals if goal.get("completed", False))
+    goal_totals = goal_stats[0] if goal_stats else {"total": 0, "completed": 0}
+    total_goals = goal_totals["total"]
+    completed_goals = goal_totals["completed"]
     goal_completion_rate = (completed_goals / total_goals * 100) if total_goals > 0 else 0
     
     return {
@@ -3122,6 +5322,146 @@ async def get_statistics(
         }
     }
 
+# Dashboard endpoint, everything the dashboard page shows in one round trip
+DASHBOARD_LIST_LIMIT = 5
+
+@app.get("/dashboard", response_model=DashboardResponse)
+@limiter.limit("60/minute")
+@cache(expire=5 * 60, namespace="dashboard", key_builder=user_cache_key_builder)  # Invalidated on write, expires for "upcoming"
+@coalesce(namespace="dashboard")
+async def get_dashboard(
+    request: Request,
+    response: Response,
+    fields: Optional[str] = FIELDS_QUERY,
+    current_user: dict = Depends(get_current_user)
+):
+    # fields picks dashboard sections, the queries behind the others are skipped
+    model, _ = select_fields(DashboardResponse, fields)
+    user_id = ObjectId(current_user["_id"])
+    user_timezone = current_user.get("timezone", DEFAULT_TIMEZONE)
+    now = datetime.now(timezone.utc)
+    
+    sections = {
+        "statistics": lambda: compute_statistics(current_user),
+        "upcoming_assignments": lambda: db.assignments.find({"user_id": user_id, "status": "pending"})
+            .sort([("due_date", ASCENDING), ("_id", ASCENDING)]).limit(DASHBOARD_LIST_LIMIT).to_list(DASHBOARD_LIST_LIMIT),
+        "upcoming_events": lambda: db.events.find({"user_id": user_id, "start_time": {"$gte": now}})
+            .sort([("start_time", ASCENDING), ("_id", ASCENDING)]).limit(DASHBOARD_LIST_LIMIT).to_list(DASHBOARD_LIST_LIMIT),
+        "recent_materials": lambda: db.materials.find({"user_id": user_id})
+            .sort([("uploaded_at", DESCENDING), ("_id", DESCENDING)]).limit(DASHBOARD_LIST_LIMIT).to_list(DASHBOARD_LIST_LIMIT)
+    }
+    selected = [name for name in sections if name in model.__fields__]
+    dashboard = dict(zip(selected, await asyncio.gather(*(sections[name]() for name in selected))))
+    
+    # One timezone conversion pass over every listed document, the cached user is copied
+    dashboard["user"] = dict(current_user)
+    documents = [dashboard["user"]]
+    for name in ("upcoming_assignments", "upcoming_events", "recent_materials"):
+        documents.extend(dashboard.get(name, []))
+    date_fields = set(datetime_fields(AssignmentResponse)) | set(datetime_fields(EventResponse)) | set(datetime_fields(MaterialResponse))
+    convert_documents_to_timezone(documents, user_timezone, date_fields)
+    
+    return document_response(model, dashboard, response)
+
+# Batch endpoint, many API calls in one request
+async def dispatch_subrequest(request: Request, item: BatchItem) -> dict:
+    """Run one batch item through the app in-process, as if it had been sent on its own.
+    
+    Routing, validation, rate limits and exception handlers all apply as usual, and the
+    batch's Authorization header resolves from the JWT cache the batch itself filled.
+    """
+    path, _, query_string = item.path.partition("?")
+    headers = {name.lower(): value for name, value in item.headers.items() if name.lower() not in ("host", "authorization")}
+    headers["authorization"] = request.headers.get("authorization", "")
+    body = b""
+    if item.body is not None:
+        body = orjson.dumps(item.body)
+        headers["content-type"] = "application/json"
+    headers["content-length"] = str(len(body))
+    scope = {
+        "type": "http",
+        "asgi": request.scope.get("asgi", {"version": "3.0"}),
+        "http_version": "1.1",
+        "method": item.method,
+        "scheme": request.url.scheme,
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query_string.encode(),
+        "root_path": request.scope.get("root_path", ""),
+        "headers": [(name.encode(), value.encode()) for name, value in headers.items()]
+                   + [(b"host", request.headers.get("host", "localhost").encode())],
+        "client": request.scope.get("client"),
+        "server": request.scope.get("server")
+    }
+    
+    body_sent = False
+    async def receive():
+        nonlocal body_sent
+        if not body_sent:
+            body_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return {"type": "http.disconnect"}
+    
+    result = {"id": item.id, "status": 500, "headers": {}, "body": None}
+    chunks = []
+    body_size = 0
+    async def send(message):
+        nonlocal body_size
+        if message["type"] == "http.response.start":
+            result["status"] = message["status"]
+            result["headers"] = {
+                name.decode().lower(): value.decode() for name, value in message.get("headers", [])
+                if name.decode().lower() in BATCH_RESPONSE_HEADERS
+            }
+        elif message["type"] == "http.response.body":
+            body_size += len(message.get("body", b""))
+            # Stop buffering once over the limit, the rest of the body is dropped as it arrives
+            if body_size <= BATCH_MAX_BODY_SIZE:
+                chunks.append(message.get("body", b""))
+            else:
+                chunks.clear()
+    
+    try:
+        await app(scope, receive, send)
+    except Exception as e:
+        # The error middleware has already sent a 500 response
+        logger.error(f"Batch request {item.method} {item.path} failed: {str(e)}")
+    
+    if body_size > BATCH_MAX_BODY_SIZE:
+        return {
+            "id": item.id,
+            "status": 413,
+            "headers": {"content-type": "application/json"},
+            "body": {"detail": f"Response body exceeds the batch limit of {BATCH_MAX_BODY_SIZE} bytes, request it on its own"}
+        }
+    
+    content = b"".join(chunks)
+    content_type = result["headers"].get("content-type", "")
+    if content and content_type.startswith("application/json"):
+        result["body"] = orjson.loads(content)
+    elif content and content_type.startswith("text/"):
+        result["body"] = content.decode("utf-8", errors="replace")
+    elif content:
+        # Binary bodies must survive the JSON envelope unchanged
+        result["body"] = base64.b64encode(content).decode()
+        result["body_encoding"] = "base64"
+    return result
+
+@app.post("/batch", response_model=BatchResponse)
+@limiter.limit("30/minute")
+async def batch(
+    request: Request,
+    batch_request: BatchRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """Run up to BATCH_MAX_REQUESTS API calls concurrently and return all their responses.
+    
+    Each item is charged against its own endpoint's rate limit. Items run concurrently,
+    so writes that depend on each other belong in separate batches.
+    """
+    responses = await asyncio.gather(*[dispatch_subrequest(request, item) for item in batch_request.requests])
+    return {"responses": responses}
+
 @app.post("/export/pdf")
 @limiter.limit("5/minute")
 async def export_pdf(
@@ -3301,6 +5641,16 @@ async def export_pdf(
 async def health_check():
     return {"status": "ok", "timestamp": datetime.now(timezone.utc)}
 
+# Monitoring counters for caches and background workers, for scrapers holding METRICS_TOKEN
+@app.get("/metrics")
+async def get_metrics(request: Request):
+    if not METRICS_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not secrets.compare_digest(token.encode(), METRICS_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Invalid metrics token", headers={"WWW-Authenticate": "Bearer"})
+    return {name: provider() for name, provider in METRICS_PROVIDERS.items()}
+
 # Run the application
 if __name__ == "__main__":
     port = int(os.getenv("PORT", 8000))
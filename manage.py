@@ -0,0 +1,45 @@
+# Maintenance commands, run against the database configured in MONGO_URI
+#
+#   python manage.py rebuild-rollups [--user USER_ID]
+#   python manage.py cache-server [--url unix:///run/user/UID/studentdashboard/cache.sock] [--max-bytes N]
+#   python manage.py migrate-blobs --to {gridfs,local}
+import argparse
+import asyncio
+
+import main
+
+async def rebuild_rollups(args):
+    await main.create_indexes()
+    rebuilt = await main.rebuild_study_rollups(args.user)
+    print(f"Rebuilt study rollups for {rebuilt} user(s)")
+
+async def cache_server(args):
+    await main.serve_shared_cache(args.url, args.max_bytes)
+
+async def migrate_blobs(args):
+    counts = await main.migrate_blobs(args.to)
+    print(f"Moved {counts['moved']} blob(s) to {args.to}, registered {counts['registered']} older material file(s), "
+          f"{counts['failed']} failed")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Student Dashboard maintenance commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    rebuild = commands.add_parser("rebuild-rollups", help="Recompute study_rollups from sessions and assignments")
+    rebuild.add_argument("--user", help="Only rebuild this user id")
+    rebuild.set_defaults(handler=rebuild_rollups)
+
+    server = commands.add_parser("cache-server", help="Run the host-local shared response cache")
+    server.add_argument("--url", default=main.CACHE_SERVER_URL or main.CACHE_SERVER_DEFAULT_URL)
+    server.add_argument("--max-bytes", type=int, default=main.CACHE_MAX_BYTES)
+    server.set_defaults(handler=cache_server)
+
+    migrate = commands.add_parser("migrate-blobs", help="Move material files into another storage backend")
+    migrate.add_argument("--to", required=True, choices=sorted(main.BLOB_BACKENDS))
+    migrate.set_defaults(handler=migrate_blobs)
+
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    asyncio.run(args.handler(args))